@@ -3,7 +3,6 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
-from sklearn.linear_model import LinearRegression
 import numpy as np
 
 def fetch_cpi_data():
@@ -40,17 +39,16 @@ def parse_data(js):
     return df_pivot.reset_index()
 
 def compute_trend(df, months_predict=6):
-    X = np.arange(len(df)).reshape(-1, 1)
+    x = np.arange(len(df))
     y = df["CPI"].values
-    model = LinearRegression()
-    model.fit(X, y)
+    slope, intercept = np.polyfit(x, y, 1)
 
-    future_X = np.arange(len(df), len(df) + months_predict).reshape(-1, 1)
-    preds = model.predict(future_X)
+    future_x = np.arange(len(df), len(df) + months_predict)
+    preds = intercept + slope * future_x
 
     last_date = df["date"].iloc[-1]
     future_dates = [last_date + relativedelta(months=i) for i in range(1, months_predict + 1)]
-    return model, list(zip(future_dates, preds))
+    return (slope, intercept), list(zip(future_dates, preds))
 
 def compute_annual_cpi(df, end_index):
     if end_index < 12:
@@ -1,30 +1,42 @@
 import os
+import threading
+import time
 from statistics import mean, median, stdev
+from datetime import date, datetime
 from typing import Optional, Tuple, List, Dict, Any
 
+import numpy as np
+import pandas as pd
 from flask import Flask, render_template, request
 from werkzeug.middleware.proxy_fix import ProxyFix
 from sqlalchemy.orm import Session
 from sqlalchemy import select, func
 
 from .models import (
-    engine,
+    engine, init_db, MOVER_METRICS,
     # CPI
-    CPIActual, ForecastRun, ForecastPoint, CPISubMetric,
+    CPIActual, ForecastRun, ForecastPoint, CPISubMetric, CPICore,
+    CPISubForecastRun, CPISubForecastPoint,
+    # Forecast accuracy
+    ForecastAccuracy,
     # Wages
-    WageActual, WageForecastRun, WageForecastPoint,
+    WageActual, WageForecastRun, WageForecastPoint, RealWageActual,
     # BCI
     BCIActual, BCIForecastRun, BCIForecastPoint,
     # PPI
     PPIActual, PPIForecastRun, PPIForecastPoint,
+    # Cache invalidation
+    DataVersion,
 )
 
 # CPI helpers from your pipelines
 from .pipelines.cpi import (
-    fetch_cpi_data,   # fetches Hagstofan CPI source
     isnr_label,       # pretty label for ISNR code
-    get_isnr_series,  # returns DataFrame with columns: date, value, (maybe Monthly Change)
+    MonthlyLevels,    # dense month grid for O(1) level lookups
+    CORE_MEASURES,    # trimmed_mean, weighted_median, exclusion cores
 )
+from .pipelines import correlation, loans
+from .pipelines.isnr import ISNRTree, LABEL_SEARCH
 
 # -----------------------------------------------------------------------------
 # Configuration / constants
@@ -164,19 +176,146 @@ def _structured_change_table(values: list[float], fut_values: list[float],
 # -----------------------------------------------------------------------------
 from typing import Tuple, List, Dict, Any
 
-def _cpi_context() -> dict:
-    """Build context for CPI: totals, forecast, full-length sub-series, movers, table."""
+def _sub_forecasts(codes: List[str], on_labels: List[str]) -> Dict[str, List[float | None]]:
+    """Newest stored sub-index projections for `codes`, aligned to `on_labels` (YYYY-MM)."""
+    if not codes or not on_labels:
+        return {}
+    with Session(engine) as s:
+        run_id = s.scalar(select(func.max(CPISubForecastRun.id)))
+        if not run_id:
+            return {}
+        points = s.execute(
+            select(CPISubForecastPoint.code, CPISubForecastPoint.date, CPISubForecastPoint.predicted_index)
+            .where(CPISubForecastPoint.run_id == run_id, CPISubForecastPoint.code.in_(codes))
+        ).all()
+    by_code: Dict[str, Dict[str, float]] = {}
+    for code, d, v in points:
+        by_code.setdefault(code, {})[d.strftime("%Y-%m")] = v
+    return {c: [vals.get(lbl) for lbl in on_labels] for c, vals in by_code.items()}
+
+BAND_KEYS = ("lo80", "hi80", "lo95", "hi95")
+
+def _bands(points) -> Dict[str, List[float | None]]:
+    """Prediction interval bounds of forecast points, one list per bound ({} if none stored)."""
+    if not any(p.lo80 is not None for p in points):
+        return {}
+    return {k: [getattr(p, k) for p in points] for k in BAND_KEYS}
+
+MOVERS_K = 6
+
+CORE_LABELS = {
+    "trimmed_mean": "Snyrt meðaltal",
+    "weighted_median": "Vegið miðgildi",
+    "ex_food_energy": "Án matar og orku",
+}
+
+def _core_context(full_labels: List[str], full_values: List[float]) -> dict:
+    """Core inflation YoY aligned to full_labels, plus the latest MoM/YoY of each measure vs headline."""
+    with Session(engine) as s:
+        rows = s.execute(select(CPICore.date, CPICore.measure, CPICore.mom, CPICore.yoy)).all()
+    pos = {lbl: i for i, lbl in enumerate(full_labels)}
+    measures = [m for m in CORE_MEASURES if any(r.measure == m for r in rows)]
+    series = {m: [None] * len(full_labels) for m in measures}
+    latest: Dict[str, Any] = {}
+    for d, m, mom, yoy in rows:
+        i = pos.get(d.strftime("%Y-%m"))
+        if i is None or m not in series:
+            continue
+        series[m][i] = yoy
+        if i == len(full_labels) - 1:
+            latest[m] = (mom, yoy)
+
+    headline_yoy = [None] * min(12, len(full_values)) + [
+        _pct(full_values[i], full_values[i - 12]) for i in range(12, len(full_values))]
+    table = [{"label": "VNV", "mom": _pct(*full_values[-2:]) if len(full_values) > 1 else None,
+              "yoy": headline_yoy[-1] if headline_yoy else None}]
+    table += [{"label": CORE_LABELS.get(m, m), "mom": latest.get(m, (None, None))[0],
+               "yoy": latest.get(m, (None, None))[1]} for m in measures]
+    return dict(
+        core_meta=[{"key": m, "label": CORE_LABELS.get(m, m)} for m in measures],
+        core_series=series,              # {measure: YoY % aligned to full_labels}
+        core_headline=headline_yoy,
+        core_table=table,
+    )
+
+def _sub_metric_months() -> List[date]:
+    """Months with sub-index metrics, newest first (cached per data version)."""
+    def build():
+        with Session(engine) as s:
+            return s.scalars(select(CPISubMetric.date).distinct().order_by(CPISubMetric.date.desc())).all()
+    return _cached("sub_metric_months", build)
+
+def _isnr_tree() -> ISNRTree:
+    """Hierarchy of the ISNR codes with stored metrics (cached per data version)."""
+    def build():
+        with Session(engine) as s:
+            return ISNRTree(s.scalars(select(CPISubMetric.code).distinct()).all())
+    return _cached("isnr_tree", build)
+
+def _top_level_codes() -> List[str]:
+    return _isnr_tree().top_level()
+
+def _movers(month: Optional[date] = None, metric: str = "d_yoy", k: int = MOVERS_K,
+            codes: Optional[List[str]] = None, exclude: List[str] = ()) -> List[CPISubMetric]:
+    """
+    Top-k CPISubMetric rows of `month` (default: latest) by MOVER_METRICS[metric],
+    as one WHERE date = ? ORDER BY <metric> DESC LIMIT k over its (date, metric) index.
+    """
+    expr = MOVER_METRICS[metric]
+    if month is None:
+        months = _sub_metric_months()
+        if not months:
+            return []
+        month = months[0]
+    q = (
+        select(CPISubMetric)
+        .where(CPISubMetric.date == month, expr.isnot(None))
+        .order_by(expr.desc())
+        .limit(k)
+    )
+    if codes is not None:
+        q = q.where(CPISubMetric.code.in_(codes))
+    if exclude:
+        q = q.where(CPISubMetric.code.notin_(exclude))
+    with Session(engine) as s:
+        return s.scalars(q).all()
+
+def _mover_row(r: CPISubMetric) -> dict:
+    return {
+        "code": r.code,
+        "label": r.label or r.code,
+        "mom": r.mom, "yoy": r.yoy,
+        "d_mom": r.delta_mom_vs_total, "d_yoy": r.delta_yoy_vs_total,
+        "weight": r.weight, "contrib_mom": r.contrib_mom, "contrib_yoy": r.contrib_yoy,
+    }
+
+def _parse_month(value: Optional[str]) -> Optional[date]:
+    """'YYYY-MM' -> first of that month (None if empty); ValueError if malformed."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value[:7], "%Y-%m").date()
+    except ValueError:
+        raise ValueError("month must be YYYY-MM")
+
+def _cpi_context(month: Optional[date] = None, metric: str = "d_yoy") -> dict:
+    """
+    Build context for CPI: totals, forecast, full-length sub-series, movers, table.
+    `month` and `metric` pick the movers snapshot (default: latest month, |ΔYoY|).
+    """
     with Session(engine) as s:
         # full history from DB
         cpi_actuals = s.scalars(select(CPIActual).order_by(CPIActual.date)).all()
         full_labels = [a.date.strftime("%Y-%m") for a in cpi_actuals]
         full_values = [a.cpi for a in cpi_actuals]
 
-        # latest forecast run (points are only future months)
+        # latest top-down forecast run (points are only future months)
         best_run_id = s.scalar(
             select(ForecastPoint.run_id)
+            .join(ForecastRun, ForecastRun.id == ForecastPoint.run_id)
+            .where(func.coalesce(ForecastRun.notes, "").notlike("bottom_up%"))
             .group_by(ForecastPoint.run_id)
-            .order_by(func.max(ForecastPoint.date).desc())
+            .order_by(func.max(ForecastPoint.date).desc(), ForecastPoint.run_id.desc())
             .limit(1)
         )
         cpi_future = []
@@ -187,6 +326,17 @@ def _cpi_context() -> dict:
                 .order_by(ForecastPoint.date)
             ).all()
 
+        # newest bottom-up run (weighted sub-index forecasts), shown for comparison
+        bu_run_id = s.scalar(
+            select(func.max(ForecastRun.id)).where(ForecastRun.notes.like("bottom_up%"))
+        )
+        bu_points = []
+        if bu_run_id:
+            bu_points = s.execute(
+                select(ForecastPoint.date, ForecastPoint.predicted_cpi)
+                .where(ForecastPoint.run_id == bu_run_id)
+            ).all()
+
     # short 24-month window used on the homepage
     labels_24 = full_labels[-24:]
     values_24 = full_values[-24:]
@@ -195,44 +345,37 @@ def _cpi_context() -> dict:
     cpi_future = cpi_future[:FORECAST_MONTHS]
     fut_labels = [p.date.strftime("%Y-%m") for p in cpi_future]
     fut_values = [p.predicted_cpi for p in cpi_future]
+    bu_by_label = {d.strftime("%Y-%m"): v for d, v in bu_points}
+    fut_bu_values = [bu_by_label.get(lbl) for lbl in fut_labels]
 
     updated = full_labels[-1] if full_labels else "N/A"
     cpi_table = _structured_change_table(values_24, fut_values, len(labels_24), len(fut_labels))
 
     # ---------- build full-length sub-series ----------
-    # We fetch raw CPI from Hagstofan and map it onto full_labels.
-    cpi_src = fetch_cpi_data()
+    # from the stored panel (cpi_sub_metrics), mapped onto full_labels
+    levels = _cached("levels:isnr", _isnr_levels)
 
     def series_for(code: str, on_labels: list[str]) -> list[float | None]:
-        df = get_isnr_series(cpi_src, code)  # df has columns: date, value, Monthly Change
-        lookup = {d.strftime("%Y-%m"): float(v) for d, v in zip(df["date"], df["value"])}
-        return [lookup.get(lbl) for lbl in on_labels]
+        if code not in levels:
+            return [None] * len(on_labels)
+        months = np.array(on_labels, dtype="datetime64[M]")
+        return [None if np.isnan(v) else float(v) for v in levels.at(code, months)]
 
     curated_meta = [{"code": c, "label": isnr_label(c) or c} for c in CURATED_ISNR]
     # FULL history for sub-series (this is what the range control needs)
     curated_series_full = {c: series_for(c, full_labels) for c in CURATED_ISNR}
 
-    # ---------- movers (latest month deltas vs total) ----------
-    rows = []
-    picked = []
-    with Session(engine) as s2:
-        latest_date = s2.scalar(select(func.max(CPISubMetric.date)))
-        if latest_date:
-            rows = s2.execute(
-                select(CPISubMetric).where(CPISubMetric.date == latest_date)
-            ).scalars().all()
-            scored = []
-            for r in rows:
-                if r.code in CURATED_ISNR:
-                    continue
-                score = (
-                    abs(r.delta_yoy_vs_total) if r.delta_yoy_vs_total is not None
-                    else (abs(r.delta_mom_vs_total) if r.delta_mom_vs_total is not None else None)
-                )
-                if score is not None:
-                    scored.append((score, r))
-            scored.sort(key=lambda t: t[0], reverse=True)
-            picked = [r for _, r in scored[:6]]
+    # ---------- movers (selected month, ranked in SQL) ----------
+    months = _sub_metric_months()
+    if month not in months:
+        month = months[0] if months else None
+    picked = _movers(month, metric, MOVERS_K, codes=_top_level_codes(), exclude=CURATED_ISNR) if month else []
+    curated_rows = []
+    if month:
+        with Session(engine) as s2:
+            curated_rows = s2.scalars(
+                select(CPISubMetric).where(CPISubMetric.date == month, CPISubMetric.code.in_(CURATED_ISNR))
+            ).all()
 
     top_meta = [{"code": r.code, "label": r.label} for r in picked]
     top_series_full = {r.code: series_for(r.code, full_labels) for r in picked}
@@ -249,143 +392,39 @@ def _cpi_context() -> dict:
             cpi_sub_meta.append(m)
             cpi_sub_series_full[m["code"]] = series_map[m["code"]]
 
-    # movers table rows (curated first, then top picks)
-    rows_by_code = {r.code: r for r in rows}
-    curated_data = []
-    for code in CURATED_ISNR:
-        r = rows_by_code.get(code)
-        if not r:
-            continue
-        curated_data.append({
-            "code": code,
-            "label": r.label or code,
-            "mom": r.mom, "yoy": r.yoy,
-            "d_mom": r.delta_mom_vs_total, "d_yoy": r.delta_yoy_vs_total,
-        })
+    # stored projections for the plotted sub-series (same horizon as the total)
+    cpi_sub_future = _sub_forecasts(list(cpi_sub_series_full), fut_labels)
 
-    seen = {d["code"] for d in curated_data}
-    top_data = []
-    for r in picked:
-        if r.code in seen:
-            continue
-        top_data.append({
-            "code": r.code,
-            "label": r.label or r.code,
-            "mom": r.mom, "yoy": r.yoy,
-            "d_mom": r.delta_mom_vs_total, "d_yoy": r.delta_yoy_vs_total,
-        })
+    # movers table rows (curated first, then top picks)
+    rows_by_code = {r.code: r for r in curated_rows}
+    curated_data = [_mover_row(rows_by_code[c]) for c in CURATED_ISNR if c in rows_by_code]
+    top_data = [_mover_row(r) for r in picked if r.code not in rows_by_code]
 
     cpi_movers = curated_data + top_data
 
     return dict(
+        **_core_context(full_labels, full_values),
         # short window (homepage)
         labels=labels_24, values=values_24,
         # full history (detail page + range control)
         full_labels=full_labels, full_values=full_values,
         # forecast
         fut_labels=fut_labels, fut_values=fut_values,
+        fut_bu_values=fut_bu_values,   # bottom-up forecast aligned to fut_labels (None if missing)
+        fut_bands=_bands(cpi_future),  # {lo80/hi80/lo95/hi95: [...] aligned to fut_labels}
         updated=updated,
         # sub-series (FULL history aligned to full_labels)
         cpi_sub_meta=cpi_sub_meta,
         cpi_sub_series=cpi_sub_series_full,
+        cpi_sub_future=cpi_sub_future,   # {code: [projection aligned to fut_labels]}
         # tables
         cpi_table=cpi_table,
         cpi_movers=cpi_movers,
+        movers_month=month.strftime("%Y-%m") if month else None,
+        movers_months=[m.strftime("%Y-%m") for m in months],
+        movers_metric=metric,
     )
 
-def build_cpi_subseries(label_list: List[str]) -> Tuple[List[dict], Dict[str, List[float]], List[dict]]:
-    """
-    Returns:
-      - sub_meta:   [{code, label}, ...]
-      - sub_series: { code: [values aligned to label_list], ... }
-      - movers:     [{code, label, mom, yoy, d_mom, d_yoy}, ...] (latest month snapshot)
-    """
-    # 1) Pull source once
-    src = fetch_cpi_data()
-
-    def series_for(code: str, labels: List[str]) -> List[float]:
-        df = get_isnr_series(src, code)  # expects columns date, value
-        mapping = {d.strftime("%Y-%m"): float(v) for d, v in zip(df["date"], df["value"])}
-        return [mapping.get(lbl) for lbl in labels]
-
-    # 2) Curated set
-    curated_meta   = [{"code": c, "label": isnr_label(c) or c} for c in CURATED_ISNR]
-    curated_series = {c: series_for(c, label_list) for c in CURATED_ISNR}
-
-    # 3) Top movers from DB (latest month)
-    rows = []
-    with Session(engine) as s:
-        latest_date = s.scalar(select(func.max(CPISubMetric.date)))
-        if latest_date:
-            rows = s.scalars(
-                select(CPISubMetric).where(CPISubMetric.date == latest_date)
-            ).all()
-
-    top_meta, top_series, picked = [], {}, []
-    if rows:
-        scored: List[tuple[float, CPISubMetric]] = []
-        for r in rows:
-            if r.code in CURATED_ISNR:
-                continue
-            score = (
-                abs(r.delta_yoy_vs_total) if r.delta_yoy_vs_total is not None
-                else (abs(r.delta_mom_vs_total) if r.delta_mom_vs_total is not None else None)
-            )
-            if score is not None:
-                scored.append((score, r))
-
-        scored.sort(key=lambda t: t[0], reverse=True)
-        picked = [r for _, r in scored[:6]]
-
-        top_meta = [{"code": r.code, "label": r.label or r.code} for r in picked]
-        for r in picked:
-            top_series[r.code] = series_for(r.code, label_list)
-
-    # 4) Merge curated + top movers (dedupe by code)
-    seen = set()
-    sub_meta: List[dict] = []
-    sub_series: Dict[str, List[float]] = {}
-
-    for meta_list, series_map in ((curated_meta, curated_series), (top_meta, top_series)):
-        for m in meta_list:
-            code = m["code"]
-            if code in seen:
-                continue
-            seen.add(code)
-            sub_meta.append(m)
-            sub_series[code] = series_map.get(code, series_for(code, label_list))
-
-    # 5) Movers snapshot (if we had rows for latest month)
-    movers: List[dict] = []
-    if rows:
-        rows_by_code = {r.code: r for r in rows}
-
-        # curated first (only those present in this month)
-        for code in CURATED_ISNR:
-            r = rows_by_code.get(code)
-            if not r:
-                continue
-            movers.append({
-                "code": code,
-                "label": r.label or code,
-                "mom": r.mom, "yoy": r.yoy,
-                "d_mom": r.delta_mom_vs_total, "d_yoy": r.delta_yoy_vs_total,
-            })
-
-        # then top picked (excluding already added)
-        already = {m["code"] for m in movers}
-        for r in picked:
-            if r.code in already:
-                continue
-            movers.append({
-                "code": r.code,
-                "label": r.label or r.code,
-                "mom": r.mom, "yoy": r.yoy,
-                "d_mom": r.delta_mom_vs_total, "d_yoy": r.delta_yoy_vs_total,
-            })
-
-    return sub_meta, sub_series, movers
-
 def _wages_context(requested_cat: str | None):
     """Build context for wages chart for a chosen category with newest forecast."""
     with Session(engine) as s:
@@ -414,7 +453,7 @@ def _wages_context(requested_cat: str | None):
             select(WageForecastPoint.run_id)
             .where(WageForecastPoint.category == cat)
             .group_by(WageForecastPoint.run_id)
-            .order_by(func.max(WageForecastPoint.date).desc())
+            .order_by(func.max(WageForecastPoint.date).desc(), WageForecastPoint.run_id.desc())
             .limit(1)
         )
         w_future = []
@@ -456,14 +495,17 @@ def _wages_context(requested_cat: str | None):
             if sel_yoy is not None and tot_yoy is not None:
                 gap_vs_total = sel_yoy - tot_yoy
 
-    # Real wage YoY = wage YoY - CPI YoY (using CPI totals)
+    # Real wages (wage / CPI), stored per month by fetch_all
     with Session(engine) as s3:
-        cpi_all = s3.scalars(select(CPIActual).order_by(CPIActual.date)).all()
-        cpi_vals = [a.cpi for a in cpi_all]
-    cpi_stats = _series_stats(cpi_vals)
-    real_wage_yoy = None
-    if wage_stats.get("curr_yoy") is not None and cpi_stats.get("curr_yoy") is not None:
-        real_wage_yoy = wage_stats["curr_yoy"] - cpi_stats["curr_yoy"]
+        real = s3.execute(
+            select(RealWageActual.date, RealWageActual.index_value, RealWageActual.yoy)
+            .where(RealWageActual.category == cat)
+            .order_by(RealWageActual.date)
+        ).all()
+    real_by_label = {d.strftime("%Y-%m"): v for d, v, _ in real}
+    real_full_values = [real_by_label.get(lbl) for lbl in wages_full_labels]
+    latest_real = next((r for r in reversed(real) if r.yoy is not None), None)
+    real_wage_yoy = latest_real.yoy if latest_real else None
 
     return dict(
         # FULL history for range switcher
@@ -473,11 +515,16 @@ def _wages_context(requested_cat: str | None):
         wages_labels=labels, wages_values=values,
         # forecast
         wages_fut_labels=fut_labels, wages_fut_values=fut_values,
+        wages_fut_bands=_bands(w_future),
         wages_updated=updated,
         # meta / stats
         wage_category=cat, wage_categories=cats,
         wage_stats=wage_stats,
         real_wage_yoy=real_wage_yoy,
+        real_wage_month=latest_real.date.strftime("%Y-%m") if latest_real else None,
+        # real wage index (100 at the category's first month) aligned to wages_full_labels
+        wages_sub_meta=[{"code": "real", "label": "Raunlaun (vísitala)"}] if real else [],
+        wages_sub_series={"real": real_full_values} if real else {},
         wage_gap_vs_total=gap_vs_total,
         wage_identical_to_total=identical_to_total,
         wage_table=wage_table,
@@ -527,7 +574,7 @@ def _bci_context(requested_cat: str | None):
             select(BCIForecastPoint.run_id)
             .where(BCIForecastPoint.category == cat)
             .group_by(BCIForecastPoint.run_id)
-            .order_by(func.max(BCIForecastPoint.date).desc())
+            .order_by(func.max(BCIForecastPoint.date).desc(), BCIForecastPoint.run_id.desc())
             .limit(1)
         )
         future = s.scalars(
@@ -562,6 +609,7 @@ def _bci_context(requested_cat: str | None):
         bci_full_labels=bci_full_labels, bci_full_values=bci_full_values,
         bci_labels=labels, bci_values=values,
         bci_fut_labels=fut_labels, bci_fut_values=fut_values,
+        bci_fut_bands=_bands(future),
         bci_updated=updated,
         bci_category=cat, bci_categories=cats,
         bci_sub_meta=bci_sub_meta, bci_sub_series_full=bci_sub_series_full,
@@ -582,7 +630,7 @@ def _ppi_context(requested_cat: str | None):
             select(PPIForecastPoint.run_id)
             .where(PPIForecastPoint.category == cat)
             .group_by(PPIForecastPoint.run_id)
-            .order_by(func.max(PPIForecastPoint.date).desc())
+            .order_by(func.max(PPIForecastPoint.date).desc(), PPIForecastPoint.run_id.desc())
             .limit(1)
         )
         future = s.scalars(
@@ -623,11 +671,497 @@ def _ppi_context(requested_cat: str | None):
         ppi_full_labels=full_labels, ppi_full_values=full_values,
         ppi_labels=labels, ppi_values=values,
         ppi_fut_labels=fut_labels, ppi_fut_values=fut_values,
+        ppi_fut_bands=_bands(future),
         ppi_updated=updated,
         ppi_category=cat, ppi_categories=cats,
         ppi_sub_meta=ppi_sub_meta, ppi_sub_series_full=ppi_sub_series_full,
     )
 
+# -----------------------------------------------------------------------------
+# Data-version cache
+# -----------------------------------------------------------------------------
+# The data is identified by the newest forecast run ids plus the DataVersion
+# counter, which every bulk_upsert that changes rows moves on (actuals and the
+# tables derived from them, even when no new run is stored). They are re-read at most
+# every DATA_VERSION_TTL seconds; when they move, everything cached for the old
+# version is dropped.
+DATA_VERSION_TTL = float(os.environ.get("CPI_DATA_VERSION_TTL", "60"))
+_VERSIONED_RUNS = (ForecastRun, CPISubForecastRun, WageForecastRun, BCIForecastRun, PPIForecastRun)
+_version: Dict[str, Any] = {"value": None, "checked": 0.0}
+_cache: Dict[Any, Any] = {}
+_cache_lock = threading.Lock()   # request threads share _version and _cache
+
+def _data_version() -> tuple:
+    with _cache_lock:
+        now = time.monotonic()
+        if _version["value"] is None or now - _version["checked"] > DATA_VERSION_TTL:
+            with Session(engine) as s:
+                value = tuple(s.scalar(select(func.max(m.id))) or 0 for m in _VERSIONED_RUNS)
+                value += (s.scalar(select(DataVersion.value)) or 0,)
+            if value != _version["value"]:
+                _cache.clear()
+            _version.update(value=value, checked=now)
+        return _version["value"]
+
+def _cached(key, build):
+    """build() once per data version for `key` (built outside the lock; a result for an old version is not kept)."""
+    version = _data_version()
+    with _cache_lock:
+        if key in _cache:
+            return _cache[key]
+    value = build()
+    with _cache_lock:
+        if _version["value"] == version:
+            value = _cache.setdefault(key, value)
+    return value
+
+
+# -----------------------------------------------------------------------------
+# Loan scenarios
+# -----------------------------------------------------------------------------
+LOAN_MAX_PATHS = 10000
+
+def _cpi_history() -> Tuple[str, Any]:
+    """(last CPI month 'YYYY-MM', bootstrap sample of monthly log changes)."""
+    with Session(engine) as s:
+        rows = s.execute(select(CPIActual.date, CPIActual.cpi).order_by(CPIActual.date)).all()
+    if not rows:
+        return "", loans.log_changes([])
+    return rows[-1][0].strftime("%Y-%m"), loans.log_changes([v for _, v in rows])
+
+def _num(name: str, default, lo, hi, cast=float):
+    raw = request.args.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if not lo <= value <= hi:
+        raise ValueError(f"{name} must be between {lo} and {hi}")
+    return value
+
+def _month_labels(last: str, months: int) -> List[str]:
+    y, m = map(int, last.split("-"))
+    k = y * 12 + m - 1 + np.arange(1, months + 1)
+    return [f"{a}-{b + 1:02d}" for a, b in zip(k // 12, k % 12)]
+
+def _loan_response() -> dict:
+    amount = _num("amount", 40_000_000.0, 1.0, 1e11)
+    rate = _num("rate", 3.5, 0.0, 30.0)
+    years = _num("years", 25, 1, 40, int)
+    paths = _num("paths", 2000, 1, LOAN_MAX_PATHS, int)
+    inflation = _num("inflation", None, -20.0, 100.0)
+    volatility = _num("volatility", 0.0, 0.0, 50.0)
+    kind = request.args.get("kind", "annuity")
+    months = years * 12
+
+    last, changes = _cached("cpi_history", _cpi_history)
+    if inflation is None and not last:
+        raise ValueError("no CPI history; pass inflation=")
+    schedule = loans.loan_schedule(amount, rate, months, kind)
+    index = loans.inflation_paths(changes, months, paths, annual=inflation, volatility=volatility)
+    out = loans.project_loan(schedule, index)
+
+    def tolist(x):
+        if isinstance(x, dict):
+            return {k: tolist(v) for k, v in x.items()}
+        return np.round(x, 4).tolist()
+
+    return {
+        "amount": amount, "rate": rate, "years": years, "kind": kind, "paths": paths,
+        "inflation": "bootstrap" if inflation is None else {"annual": inflation, "volatility": volatility},
+        "labels": _month_labels(last or time.strftime("%Y-%m"), months),
+        "real": {"payment": tolist(schedule.payment), "balance": tolist(schedule.balance)},
+        **tolist(out),
+    }
+
+
+# -----------------------------------------------------------------------------
+# Inflation calculator
+# -----------------------------------------------------------------------------
+HEADLINE_CODE = "IS00"  # served from CPIActual (spliced back to 1988)
+
+def _headline_levels() -> MonthlyLevels:
+    with Session(engine) as s:
+        rows = s.execute(select(CPIActual.date, CPIActual.cpi).order_by(CPIActual.date)).all()
+    panel = pd.DataFrame({HEADLINE_CODE: [v for _, v in rows]},
+                         index=pd.to_datetime([d for d, _ in rows]))
+    return MonthlyLevels.from_panel(panel)
+
+def _isnr_levels() -> MonthlyLevels:
+    """Every ISNR code's history, from cpi_sub_metrics (kept in step by fetch_all)."""
+    with Session(engine) as s:
+        rows = s.execute(select(CPISubMetric.date, CPISubMetric.code, CPISubMetric.value)
+                         .where(CPISubMetric.value.isnot(None))).all()
+    long = pd.DataFrame(rows, columns=["date", "code", "value"])
+    panel = long.pivot(index="date", columns="code", values="value")
+    panel.index = pd.to_datetime(panel.index)
+    return MonthlyLevels.from_panel(panel)
+
+def _levels_for(code: str) -> MonthlyLevels:
+    if code == HEADLINE_CODE:
+        return _cached("levels:headline", _headline_levels)
+    return _cached("levels:isnr", _isnr_levels)
+
+def _months_arg(name: str) -> Optional[np.ndarray]:
+    """Comma-separated and/or repeated YYYY-MM values as datetime64[M] (None if absent)."""
+    raw = [v.strip() for arg in request.args.getlist(name) for v in arg.split(",") if v.strip()]
+    if not raw:
+        return None
+    try:
+        return np.array([v.replace("M", "-") for v in raw], dtype="datetime64[M]")
+    except ValueError:
+        raise ValueError(f"{name} must be months as YYYY-MM")
+
+def _inflation_response() -> dict:
+    code = request.args.get("code", HEADLINE_CODE).strip().upper()
+    levels = _levels_for(code)
+    if code not in levels:
+        raise LookupError(f"unknown code {code}")
+    first, last = levels.span(code)
+
+    start = _months_arg("from")
+    if start is None:
+        raise ValueError("from is required")
+    end = _months_arg("to")
+    if end is None:
+        end = np.array([last])
+    raw = [v for arg in request.args.getlist("amount") for v in arg.split(",") if v.strip()]
+    try:
+        amount = np.array(raw or [1.0], dtype=float)
+    except ValueError:
+        raise ValueError("amount must be numbers")
+    try:
+        start, end, amount = np.broadcast_arrays(start, end, amount)
+    except ValueError:
+        raise ValueError("from, to and amount must have the same length (or length 1)")
+
+    ratio = levels.ratio(code, start, end)
+    clean = lambda a: [None if not np.isfinite(v) else round(float(v), 6) for v in a]
+    return {
+        "code": code, "label": isnr_label(code) or code,
+        "available": {"from": str(first), "to": str(last)},
+        "from": start.astype(str).tolist(), "to": end.astype(str).tolist(),
+        "amount": amount.tolist(),
+        "value": clean(amount * ratio),
+        "ratio": clean(ratio),
+        "change_pct": clean((ratio - 1.0) * 100.0),
+    }
+
+
+# -----------------------------------------------------------------------------
+# Contributions to headline inflation
+# -----------------------------------------------------------------------------
+CONTRIB_MEASURES = {"mom": 1, "yoy": 12}   # measure -> months of the headline change
+
+def _contributions(measure: str) -> Tuple[pd.DataFrame, pd.Series]:
+    """(month × code pp contributions, headline % change) for `measure`, cached per data version."""
+    def build():
+        column = getattr(CPISubMetric, f"contrib_{measure}")
+        with Session(engine) as s:
+            rows = s.execute(select(CPISubMetric.date, CPISubMetric.code, column)
+                             .where(column.isnot(None))).all()
+            head = s.execute(select(CPIActual.date, CPIActual.cpi).order_by(CPIActual.date)).all()
+        panel = pd.DataFrame(rows, columns=["date", "code", "pp"]).pivot(index="date", columns="code", values="pp")
+        headline = pd.Series([v for _, v in head], index=[d for d, _ in head], dtype=float)
+        headline = headline.pct_change(CONTRIB_MEASURES[measure], fill_method=None) * 100.0
+        return panel.sort_index(), headline
+    return _cached(f"contrib:{measure}", build)
+
+def _contributions_response() -> dict:
+    measure = request.args.get("measure", "mom")
+    if measure not in CONTRIB_MEASURES:
+        raise ValueError(f"measure must be one of {', '.join(CONTRIB_MEASURES)}")
+    start, end = _parse_month(request.args.get("from")), _parse_month(request.args.get("to"))
+    panel, headline = _contributions(measure)
+
+    codes = [c.strip().upper() for arg in request.args.getlist("codes") for c in arg.split(",") if c.strip()]
+    if not codes:
+        codes = _top_level_codes()
+    known = _cached("levels:isnr", _isnr_levels)
+    unknown = [c for c in codes if c not in known]
+    if unknown:
+        raise LookupError(f"unknown code {', '.join(unknown)}")
+
+    view = panel.reindex(columns=codes).loc[start:end]  # codes without weights stay empty
+    head = headline.reindex(view.index)
+    clean = lambda a: [None if not np.isfinite(v) else round(float(v), 4) for v in a]
+    return {
+        "measure": measure,
+        "labels": [d.strftime("%Y-%m") for d in view.index],
+        "series": {c: clean(view[c].to_numpy()) for c in codes},
+        "names": {c: isnr_label(c) or c for c in codes},
+        "headline": clean(head.to_numpy()),
+        "other": clean((head - view.sum(axis=1, min_count=1)).to_numpy()),  # codes not selected
+    }
+
+
+# -----------------------------------------------------------------------------
+# ISNR explorer
+# -----------------------------------------------------------------------------
+EXPLORER_COLUMNS = ("value", "mom", "yoy", "weight", "contrib_mom", "contrib_yoy")
+
+def _latest_sub_metrics() -> Dict[str, CPISubMetric]:
+    """Every code's row for the newest month (cached per data version)."""
+    def build():
+        months = _sub_metric_months()
+        if not months:
+            return {}
+        with Session(engine) as s:
+            rows = s.scalars(select(CPISubMetric).where(CPISubMetric.date == months[0])).all()
+            s.expunge_all()
+        return {r.code: r for r in rows}
+    return _cached("latest_sub_metrics", build)
+
+def _node(code: Optional[str]) -> Optional[dict]:
+    return None if code is None else {"code": code, "label": isnr_label(code) or code}
+
+def _explore(code: str) -> dict:
+    """Full stored series, stats, place in the hierarchy and children of one ISNR code."""
+    tree = _isnr_tree()
+    if code not in tree:
+        raise LookupError(f"unknown code {code}")
+    with Session(engine) as s:
+        rows = s.execute(
+            select(CPISubMetric.date, *[CPISubMetric.__table__.c[c] for c in EXPLORER_COLUMNS])
+            .where(CPISubMetric.code == code)
+            .order_by(CPISubMetric.date)
+        ).all()
+    labels = [r.date.strftime("%Y-%m") for r in rows]
+    values = [r.value for r in rows]
+
+    fut_labels = []
+    if rows:
+        nxt = pd.date_range(rows[-1].date, periods=FORECAST_MONTHS + 1, freq="MS")[1:]
+        fut_labels = [d.strftime("%Y-%m") for d in nxt]
+    forecast = _sub_forecasts([code], fut_labels).get(code, [])
+
+    latest = _latest_sub_metrics()
+    children = []
+    for c in tree.children(code):
+        r = latest.get(c)
+        children.append({**_node(c), "children": len(tree.children(c)),
+                         **{k: getattr(r, k, None) for k in ("mom", "yoy", "weight", "contrib_mom")}})
+    return {
+        **_node(code),
+        "depth": tree.depth(code),
+        "path": [_node(c) for c in reversed(tree.ancestors(code))],  # outermost .. parent
+        "children": children,
+        "series": {"labels": labels, **{c: [getattr(r, c) for r in rows] for c in EXPLORER_COLUMNS}},
+        "forecast": {"labels": fut_labels[:len(forecast)], "value": forecast},
+        "stats": _series_stats(values),
+    }
+
+
+# -----------------------------------------------------------------------------
+# Cross-index correlations
+# -----------------------------------------------------------------------------
+CORR_MAX_LAG = 24
+
+def _index_series() -> pd.DataFrame:
+    """Every stored index level (CPI, its main groups, wage/BCI/PPI categories) on one month axis."""
+    def build():
+        series: Dict[str, pd.Series] = {}
+        with Session(engine) as s:
+            series["cpi"] = pd.Series(dict(s.execute(select(CPIActual.date, CPIActual.cpi)).all()), dtype=float)
+            top = _top_level_codes()
+            rows = s.execute(select(CPISubMetric.date, CPISubMetric.code, CPISubMetric.value)
+                             .where(CPISubMetric.code.in_(top))).all()
+            for family, model in (("wages", WageActual), ("bci", BCIActual), ("ppi", PPIActual)):
+                got = s.execute(select(model.date, model.category, model.index_value)).all()
+                for cat, g in pd.DataFrame(got, columns=["date", "cat", "v"]).groupby("cat"):
+                    series[f"{family}:{cat}"] = g.set_index("date")["v"]
+        for code, g in pd.DataFrame(rows, columns=["date", "code", "v"]).groupby("code"):
+            series[f"cpi:{code}"] = g.set_index("date")["v"]
+        return correlation.aligned_panel(series)
+    return _cached("index_series", build)
+
+def _correlations(transform: str) -> dict:
+    """Changes and lagged (±CORR_MAX_LAG) correlations of all series, cached per data version."""
+    def build():
+        X = correlation.changes(_index_series(), transform)
+        C = correlation.lagged_correlations(X.to_numpy(), CORR_MAX_LAG)
+        return {"names": list(X.columns), "months": X.index, "changes": X.to_numpy(), "lagged": C}
+    return _cached(f"corr:{transform}", build)
+
+def _json_array(a: np.ndarray, digits: int = 4) -> list:
+    return np.where(np.isfinite(a), np.round(a, digits), None).tolist()
+
+def _correlations_response() -> dict:
+    transform = request.args.get("transform", "mom")
+    if transform not in correlation.TRANSFORMS:
+        raise ValueError(f"transform must be one of {', '.join(correlation.TRANSFORMS)}")
+    max_lag = _num("max_lag", 12, 0, CORR_MAX_LAG, int)
+    window = _num("window", 36, 12, 240, int)
+    res = _correlations(transform)
+    names = res["names"]
+
+    picked = [v.strip() for arg in request.args.getlist("series") for v in arg.split(",") if v.strip()] or names
+    base = request.args.get("with", "cpi")
+    unknown = [v for v in [*picked, base] if v not in names]
+    if unknown:
+        raise LookupError(f"unknown series {', '.join(unknown)} (have {', '.join(names)})")
+    ix = np.array([names.index(v) for v in picked])
+    lags = slice(CORR_MAX_LAG - max_lag, CORR_MAX_LAG + max_lag + 1)
+    sub = np.ix_(ix, ix)
+
+    # strongest lag within ±max_lag for the picked pairs
+    lag, best = correlation.lead_lag(res["lagged"][lags][:, ix][:, :, ix], max_lag)
+    # rolling window against `base` only, for the requested window
+    X = res["changes"]
+    b = names.index(base)
+    rolling = correlation.rolling_correlations(X[:, [b]], window, Y=X[:, ix])[:, 0, :]
+    keep = np.isfinite(rolling).any(axis=1)
+    return {
+        "transform": transform,
+        "series": picked,
+        "lags": list(range(-max_lag, max_lag + 1)),
+        "corr": _json_array(res["lagged"][CORR_MAX_LAG][sub]),
+        "lagged": _json_array(res["lagged"][lags][:, ix][:, :, ix]),  # [lag][i][j]: corr(i(t), j(t+lag))
+        "lead_lag": {"lag": np.asarray(lag).tolist(), "corr": _json_array(best)},
+        "rolling": {
+            "with": base, "window": window,
+            "labels": [d.strftime("%Y-%m") for d in res["months"][keep]],
+            "values": {v: _json_array(rolling[keep, k]) for k, v in enumerate(picked)},
+        },
+    }
+
+
+# -----------------------------------------------------------------------------
+# Batch series queries
+# -----------------------------------------------------------------------------
+QUERY_INDEXES = {"wages": WageActual, "bci": BCIActual, "ppi": PPIActual}  # plus "cpi" (ISNR codes)
+QUERY_TRANSFORMS = ("level", "mom", "yoy", "rebase", "real")
+QUERY_MAX_ITEMS = 100
+QUERY_MAX_MONTHS = 1200   # month axis of one response, from the earliest from (less the yoy lookback) to the latest to
+
+def _query_levels() -> MonthlyLevels:
+    """Every stored level as "index:code" rows (cpi:IS00 is the spliced headline), cached per data version."""
+    def build():
+        with Session(engine) as s:
+            frames = [
+                pd.DataFrame(s.execute(select(CPISubMetric.date, CPISubMetric.code, CPISubMetric.value)
+                                       .where(CPISubMetric.value.isnot(None))).all(),
+                             columns=["date", "code", "value"]).assign(index="cpi"),
+                pd.DataFrame(s.execute(select(CPIActual.date, CPIActual.cpi)).all(),
+                             columns=["date", "value"]).assign(index="cpi", code=HEADLINE_CODE),
+            ]
+            for name, model in QUERY_INDEXES.items():
+                frames.append(pd.DataFrame(s.execute(select(model.date, model.category, model.index_value)).all(),
+                                           columns=["date", "code", "value"]).assign(index=name))
+        long = pd.concat(frames, ignore_index=True)
+        long["key"] = long["index"] + ":" + long["code"]
+        panel = long.pivot_table(index="date", columns="key", values="value", aggfunc="last")
+        panel.index = pd.to_datetime(panel.index)
+        return MonthlyLevels.from_panel(panel)
+    return _cached("levels:query", build)
+
+def _query_month(value, field: str, default: Optional[np.datetime64] = None) -> Optional[np.datetime64]:
+    if value in (None, ""):
+        return default
+    try:
+        month = np.datetime64(str(value).strip().replace("M", "-"), "M")
+    except ValueError:
+        month = np.datetime64("NaT")
+    if np.isnat(month):
+        raise ValueError(f"{field} must be a month as YYYY-MM")
+    return month
+
+def _query_items(body) -> List[dict]:
+    """Validated items of a /api/query body with defaults filled in (from/to: the series' own span)."""
+    items = body.get("items") if isinstance(body, dict) else body
+    if not isinstance(items, list) or not items:
+        raise ValueError("body must be a list of items (or {\"items\": [...]})")
+    if len(items) > QUERY_MAX_ITEMS:
+        raise ValueError(f"at most {QUERY_MAX_ITEMS} items per query")
+    levels = _query_levels()
+    out = []
+    for n, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"item {n} must be an object")
+        index = str(item.get("index", "cpi")).strip().lower()
+        if index != "cpi" and index not in QUERY_INDEXES:
+            raise LookupError(f"item {n}: unknown index {index} (have cpi, {', '.join(QUERY_INDEXES)})")
+        code = str(item.get("code") or item.get("category") or (HEADLINE_CODE if index == "cpi" else "TOTAL")).strip()
+        if index == "cpi":
+            code = code.upper()
+        key = f"{index}:{code}"
+        if key not in levels:
+            raise LookupError(f"item {n}: unknown code {code} for {index}")
+        transform = str(item.get("transform", "level")).strip().lower()
+        if transform not in QUERY_TRANSFORMS:
+            raise ValueError(f"item {n}: transform must be one of {', '.join(QUERY_TRANSFORMS)}")
+        first, last = levels.span(key)
+        # clamped to the stored span, so the month axis is bounded by the data
+        start = max(_query_month(item.get("from"), f"item {n}: from", first), first)
+        end = min(_query_month(item.get("to"), f"item {n}: to", last), last)
+        if end < start:
+            raise ValueError(f"item {n}: no {key} data from {item.get('from') or first} to {item.get('to') or last} "
+                             f"(have {first} to {last})")
+        base = _query_month(item.get("base"), f"item {n}: base", start)
+        if transform in ("rebase", "real") and not first <= base <= last:
+            raise ValueError(f"item {n}: base must be within {first} to {last}")
+        out.append({
+            "id": str(item.get("id") or f"{key}:{transform}"),
+            "index": index, "code": code, "key": key, "transform": transform,
+            "label": (isnr_label(code) or code) if index == "cpi" else code,
+            "from": start, "to": end,
+            "base": base,
+        })
+    ids = [it["id"] for it in out]
+    if len(set(ids)) < len(ids):
+        raise ValueError("item ids must be unique")
+    return out
+
+def _query_response(body) -> dict:
+    """
+    Resolve every item against one (items × months) slice of the cached levels:
+    level, mom/yoy (% vs 1/12 months earlier), rebase (100 in `base`, default
+    `from`) and real (deflated by headline CPI, 100 in `base`). Values sit on one
+    shared month axis, null outside each item's from..to.
+    """
+    items = _query_items(body)
+    levels = _query_levels()
+    start = np.array([it["from"] for it in items])
+    end = np.array([it["to"] for it in items])
+    base = np.array([it["base"] for it in items])
+    lo = min(start.min() - 12, base.min())          # room for the yoy lookback and the bases
+    hi = max(end.max(), base.max())
+    if hi - lo + 1 > QUERY_MAX_MONTHS:
+        raise ValueError(f"items span {hi - lo + 1} months (at most {QUERY_MAX_MONTHS} per query)")
+    months = np.arange(lo, hi + 1)
+
+    V = np.vstack([levels.at(it["key"], months) for it in items])
+    H = levels.at(f"cpi:{HEADLINE_CODE}", months)
+    transform = np.array([it["transform"] for it in items])
+    col = lambda m: (m - lo).astype(np.int64)
+    rows = np.arange(len(items))
+
+    out = V.copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for name, k in (("mom", 1), ("yoy", 12)):
+            sel = transform == name
+            prev = np.full_like(V[sel], np.nan)
+            prev[:, k:] = V[sel][:, :-k]
+            out[sel] = (V[sel] / prev - 1.0) * 100.0
+        real = V / H
+        for name, X in (("rebase", V), ("real", real)):
+            sel = transform == name
+            out[sel] = X[sel] / X[rows[sel], col(base[sel])][:, None] * 100.0
+
+    m = months[None, :]
+    out[(m < start[:, None]) | (m > end[:, None]) | ~np.isfinite(out)] = np.nan
+    keep = slice(col(start.min()), col(end.max()) + 1)
+    return {
+        "labels": months[keep].astype(str).tolist(),
+        "items": [{k: str(it[k]) if isinstance(it[k], np.datetime64) else it[k]
+                   for k in ("id", "index", "code", "label", "transform", "from", "to", "base")}
+                  for it in items],
+        "columns": {it["id"]: _json_array(out[i, keep], 6) for i, it in enumerate(items)},
+    }
+
+
 # -----------------------------------------------------------------------------
 # Flask app / routes
 # -----------------------------------------------------------------------------
@@ -635,11 +1169,104 @@ def create_app():
     app = Flask(__name__)
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
     app.config["SITE_NAME"] = os.environ.get("SITE_NAME", "Efnahagur")
+    init_db()  # add columns/indexes newer than the database file
 
     @app.get("/health")
     def health():
         return {"ok": True}
 
+    # Forecast accuracy summaries (kept up to date by jobs/accuracy.py)
+    @app.get("/api/accuracy")
+    def api_accuracy():
+        family = request.args.get("family", "cpi")
+        by = request.args.get("by", "horizon")
+        if by not in ("horizon", "anchor"):
+            return {"error": "by must be 'horizon' or 'anchor'"}, 400
+        q = select(ForecastAccuracy).where(ForecastAccuracy.family == family, ForecastAccuracy.by == by)
+        if request.args.get("category"):
+            q = q.where(ForecastAccuracy.category == request.args["category"])
+        if request.args.get("model"):
+            q = q.where(ForecastAccuracy.model == request.args["model"])
+        with Session(engine) as s:
+            rows = s.scalars(q).all()
+        key = (lambda r: int(r.bucket)) if by == "horizon" else (lambda r: r.bucket)
+        rows.sort(key=lambda r: (r.category, r.model, key(r)))
+        return {
+            "family": family, "by": by,
+            "rows": [
+                {"category": r.category, "model": r.model, "bucket": r.bucket,
+                 "n": r.n, "mae": r.mae, "mape": r.mape, "bias": r.bias}
+                for r in rows
+            ],
+        }
+
+    # Indexed (verðtryggð) loan projections over simulated CPI paths
+    @app.get("/api/loan")
+    def api_loan():
+        try:
+            return _loan_response()
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+    # What an amount from one month is worth in another (headline or any ISNR code)
+    @app.get("/api/inflation")
+    def api_inflation():
+        try:
+            return _inflation_response()
+        except LookupError as e:
+            return {"error": str(e)}, 404
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+    # Each code's pp contribution to headline MoM/YoY, month by month (stacked charts)
+    @app.get("/api/cpi/contributions")
+    def api_cpi_contributions():
+        try:
+            return _contributions_response()
+        except LookupError as e:
+            return {"error": str(e)}, 404
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+    # Typeahead over ISNR labels (accent-folded prefixes, then trigram matches)
+    @app.get("/api/isnr/search")
+    def api_isnr_search():
+        try:
+            limit = _num("limit", 10, 1, 50, int)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        q = request.args.get("q", "")
+        return {"q": q, "results": LABEL_SEARCH.search(q, limit)}
+
+    # Any ISNR code from the local store: series, stats, path and children
+    @app.get("/api/isnr/<code>")
+    def api_isnr(code: str):
+        code = code.strip().upper()
+        try:
+            return _cached(f"isnr:{code}", lambda: _explore(code))
+        except LookupError as e:
+            return {"error": str(e)}, 404
+
+    # Many series × ranges × transforms in one round trip (columnar JSON)
+    @app.post("/api/query")
+    def api_query():
+        try:
+            return _query_response(request.get_json(silent=True))
+        except LookupError as e:
+            return {"error": str(e)}, 404
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+    # Correlations and lead/lag between CPI (and main groups), wages, BCI and PPI
+    @app.get("/api/correlations")
+    def api_correlations():
+        try:
+            return _correlations_response()
+        except LookupError as e:
+            return {"error": str(e)}, 404
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
     # Home: four cards (CPI, Wages, BCI, PPI)
     @app.get("/")
     def index():
@@ -653,10 +1280,36 @@ def create_app():
             **cpi_ctx, **wages_ctx, **bci_ctx, **ppi_ctx
         )
 
+    # Top movers of any month by |ΔYoY|, |ΔMoM| or |contribution|
+    @app.get("/api/cpi/movers")
+    def api_cpi_movers():
+        metric = request.args.get("metric", "d_yoy")
+        if metric not in MOVER_METRICS:
+            return {"error": f"metric must be one of {', '.join(MOVER_METRICS)}"}, 400
+        try:
+            month = _parse_month(request.args.get("month"))
+            k = _num("k", 10, 1, 100, int)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        codes = _top_level_codes() if request.args.get("level") == "top" else None
+        month = month or next(iter(_sub_metric_months()), None)
+        rows = _movers(month, metric, k, codes=codes) if month else []
+        return {
+            "month": month.strftime("%Y-%m") if month else None,
+            "metric": metric,
+            "rows": [_mover_row(r) for r in rows],
+        }
+
     # CPI detail (with sub-series)
     @app.get("/cpi")
     def cpi_page():
-        ctx = _cpi_context()  # contains: full_labels/full_values, fut_*, cpi_sub_meta, cpi_sub_series (FULL), tables, movers
+        metric = request.args.get("metric", "d_yoy")
+        try:
+            month = _parse_month(request.args.get("month"))
+        except ValueError:
+            month = None
+        # contains: full_labels/full_values, fut_*, cpi_sub_meta, cpi_sub_series (FULL), tables, movers
+        ctx = _cpi_context(month, metric if metric in MOVER_METRICS else "d_yoy")
         return render_template(
             "cpi.html",
             site_name=app.config["SITE_NAME"],
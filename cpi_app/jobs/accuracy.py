@@ -0,0 +1,207 @@
+# cpi_app/jobs/accuracy.py
+"""
+Forecast accuracy: join every stored forecast point to its realized actual.
+
+update_accuracy() is incremental. It only touches points that gained an actual,
+whose actual was revised, or that were deleted since the last pass (backfills
+replace their runs). It then recomputes the MAE/MAPE/bias summaries for the
+affected categories only.
+
+    python -m cpi_app.jobs.accuracy            # incremental
+    python -m cpi_app.jobs.accuracy --rebuild  # drop and recompute everything
+"""
+import argparse
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from sqlalchemy import and_, delete, func, literal, or_, select
+from sqlalchemy.orm import Session
+
+from cpi_app.models import (
+    SessionLocal, init_db, bulk_upsert,
+    ForecastError, ForecastAccuracy,
+    CPIActual, ForecastRun, ForecastPoint,
+    CPISubMetric, CPISubForecastRun, CPISubForecastPoint,
+    WageActual, WageForecastRun, WageForecastPoint,
+    BCIActual, BCIForecastRun, BCIForecastPoint,
+    PPIActual, PPIForecastRun, PPIForecastPoint,
+)
+
+
+@dataclass(frozen=True)
+class Family:
+    name: str
+    run: Any
+    point: Any
+    predicted: Any                 # point column
+    actual: Any
+    value: Any                     # actual column
+    point_key: Any = None          # category column on the point (None: single series)
+    actual_key: Any = None
+    point_model: Any = None        # per-point model column (else parsed from run notes)
+    label: str = ""                # category name for single-series families
+
+
+FAMILIES = [
+    Family("cpi", ForecastRun, ForecastPoint, ForecastPoint.predicted_cpi,
+           CPIActual, CPIActual.cpi, label="CPI"),
+    Family("cpi_sub", CPISubForecastRun, CPISubForecastPoint, CPISubForecastPoint.predicted_index,
+           CPISubMetric, CPISubMetric.value, CPISubForecastPoint.code, CPISubMetric.code,
+           point_model=CPISubForecastPoint.model),
+    Family("wages", WageForecastRun, WageForecastPoint, WageForecastPoint.predicted_index,
+           WageActual, WageActual.index_value, WageForecastPoint.category, WageActual.category),
+    Family("bci", BCIForecastRun, BCIForecastPoint, BCIForecastPoint.predicted_index,
+           BCIActual, BCIActual.index_value, BCIForecastPoint.category, BCIActual.category),
+    Family("ppi", PPIForecastRun, PPIForecastPoint, PPIForecastPoint.predicted_index,
+           PPIActual, PPIActual.index_value, PPIForecastPoint.category, PPIActual.category),
+]
+
+
+def model_from_notes(notes: Optional[str]) -> str:
+    """'backfill:2024-05:linear_reg_24m' -> 'linear_reg_24m' (older wage runs: 'window24')."""
+    notes = notes or ""
+    if notes.startswith("bottom_up"):
+        return "bottom_up"
+    m = re.search(r"linear_reg_\d+m", notes)
+    if m:
+        return m.group(0)
+    m = re.search(r"window(\d+)", notes)
+    if m:
+        return f"linear_reg_{m.group(1)}m"
+    return re.split(r"[:\s]", notes.strip())[-1] or "unknown"
+
+
+def _month_index(dates: pd.Series) -> pd.Series:
+    d = pd.to_datetime(dates)
+    return d.dt.year * 12 + d.dt.month - 1
+
+
+def _pending(s: Session, fam: Family, rebuild: bool) -> pd.DataFrame:
+    """Points with an actual that have no error row yet, or whose values changed."""
+    P, E = fam.point, ForecastError
+    # each series of a run is anchored on its own last actual: first month per (run, category)
+    series = [P.run_id] if fam.point_key is None else [P.run_id, fam.point_key]
+    first = (
+        select(*series, func.min(P.date).label("first"))
+        .group_by(*series)
+        .subquery()
+    )
+    on_first = first.c.run_id == P.run_id
+    if fam.point_key is not None:
+        on_first = and_(on_first, first.c[fam.point_key.key] == fam.point_key)
+    category = fam.point_key if fam.point_key is not None else literal(fam.label)
+    model = fam.point_model if fam.point_model is not None else literal(None)
+    on_actual = fam.actual.date == P.date
+    if fam.point_key is not None:
+        on_actual = and_(on_actual, fam.actual_key == fam.point_key)
+
+    q = (
+        select(P.id.label("point_id"), P.run_id, category.label("category"), P.date,
+               fam.predicted.label("predicted"), fam.value.label("actual"),
+               fam.run.notes, model.label("model"), first.c.first)
+        .join(fam.run, fam.run.id == P.run_id)
+        .join(first, on_first)
+        .join(fam.actual, on_actual)
+        .where(fam.value.isnot(None))
+    )
+    if not rebuild:
+        q = (
+            q.outerjoin(E, and_(E.family == fam.name, E.point_id == P.id))
+            .where(or_(E.id.is_(None), E.actual != fam.value, E.predicted != fam.predicted,
+                       E.run_id != P.run_id, E.date != P.date))  # ids can be reused after deletes
+        )
+    df = pd.DataFrame(s.execute(q).all(), columns=[
+        "point_id", "run_id", "category", "date", "predicted", "actual", "notes", "model", "first"])
+    if df.empty:
+        return df
+
+    # anchored runs start the month after the last actual they were built on
+    anchor = pd.to_datetime(df["first"]).dt.to_period("M").dt.to_timestamp() - pd.DateOffset(months=1)
+    df["family"] = fam.name
+    df["model"] = df["model"].where(df["model"].notna(), df["notes"].map(model_from_notes))
+    df["anchor"] = anchor.dt.date
+    df["horizon"] = _month_index(df["date"]) - _month_index(anchor)
+    df["error"] = df["predicted"] - df["actual"]
+    df["ape"] = (df["error"].abs() / df["actual"].abs() * 100.0).where(df["actual"] != 0)
+    return df.drop(columns=["notes", "first"])
+
+
+def _summarize(s: Session, family: str, categories) -> pd.DataFrame:
+    """Accuracy rows for every (category, model) of `categories`, by horizon and by anchor."""
+    E = ForecastError
+    errs = pd.DataFrame(s.execute(
+        select(E.category, E.model, E.horizon, E.anchor, E.error, E.ape)
+        .where(E.family == family, E.category.in_(list(categories)))
+    ).all(), columns=["category", "model", "horizon", "anchor", "error", "ape"])
+    if errs.empty:
+        return errs
+    errs["abs"] = errs["error"].abs()
+    errs["horizon"] = errs["horizon"].astype(str)
+    errs["anchor"] = pd.to_datetime(errs["anchor"]).dt.strftime("%Y-%m")
+
+    out = []
+    for by in ("horizon", "anchor"):
+        g = errs.groupby(["category", "model", by]).agg(
+            n=("error", "size"), mae=("abs", "mean"), mape=("ape", "mean"), bias=("error", "mean"))
+        out.append(g.reset_index().rename(columns={by: "bucket"}).assign(by=by))
+    return pd.concat(out, ignore_index=True).assign(family=family)
+
+
+def update_accuracy(s: Session, rebuild: bool = False) -> Dict[str, int]:
+    """Bring forecast_errors and forecast_accuracy up to date. Returns changed points per family."""
+    E, A = ForecastError, ForecastAccuracy
+    changed: Dict[str, int] = {}
+    for fam in FAMILIES:
+        if rebuild:
+            s.execute(delete(E).where(E.family == fam.name))
+            s.execute(delete(A).where(A.family == fam.name))
+
+        # error rows whose forecast point was deleted (backfills replace runs)
+        gone = s.execute(
+            select(E.id, E.category)
+            .outerjoin(fam.point, fam.point.id == E.point_id)
+            .where(E.family == fam.name, fam.point.id.is_(None))
+        ).all()
+        if gone:
+            ids = [i for i, _ in gone]
+            for i in range(0, len(ids), 500):
+                s.execute(delete(E).where(E.id.in_(ids[i:i + 500])))
+
+        df = _pending(s, fam, rebuild)
+        if not df.empty:
+            bulk_upsert(s, E, df, keys=["family", "point_id"])
+
+        touched = set(df["category"]) if not df.empty else set()
+        touched |= {c for _, c in gone}
+        changed[fam.name] = len(df) + len(gone)
+        if not touched:
+            continue
+
+        s.execute(delete(A).where(A.family == fam.name, A.category.in_(list(touched))))
+        summary = _summarize(s, fam.name, touched)
+        if not summary.empty:
+            summary = summary.astype(object).where(summary.notna(), None)
+            s.execute(A.__table__.insert(), summary.to_dict("records"))
+    return changed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Join stored forecasts to actuals and summarize accuracy.")
+    ap.add_argument("--rebuild", action="store_true", help="Drop and recompute all accuracy rows")
+    args = ap.parse_args()
+
+    init_db()
+    with SessionLocal() as s:
+        try:
+            changed = update_accuracy(s, rebuild=args.rebuild)
+            s.commit()
+        except Exception:
+            s.rollback()
+            raise
+    print("✅ Forecast accuracy: " + ", ".join(f"{k} {v}" for k, v in changed.items()))
+
+
+if __name__ == "__main__":
+    main()
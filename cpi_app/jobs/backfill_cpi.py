@@ -2,49 +2,65 @@
 from __future__ import annotations
 
 import argparse
+import time
 from datetime import datetime, timezone, date
-from typing import Iterator
+from typing import Iterable
 
+import numpy as np
+import pandas as pd
 from sqlalchemy.orm import Session
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, insert, func
 
 from ..models import (
-    Base, engine, SessionLocal,
+    SessionLocal, init_db, bulk_upsert, UpsertResult,
     CPIActual, ForecastRun, ForecastPoint,
 )
-from ..pipelines.cpi import fetch_cpi_data, parse_data as parse_cpi, compute_trend
+from ..pipelines.cpi import fetch_cpi_data, parse_data as parse_cpi
+from ..pipelines.forecast import rolling_ols
 
 def parse_ym(s: str) -> date:
     return datetime.strptime(s, "%Y-%m").date()
 
-def month_iter(start: date, end: date) -> Iterator[date]:
-    y, m = start.year, start.month
-    while True:
-        d = date(y, m, 1)
-        if d > end:
-            break
-        yield d
-        # next month
-        m += 1
-        if m == 13:
-            m = 1
-            y += 1
-
-def upsert_cpi_actual(s: Session, d: date, cpi_value: float, monthly_change: float | None) -> None:
-    obj = s.query(CPIActual).filter_by(date=d).one_or_none()
-    if obj:
-        obj.cpi = float(cpi_value)
-        obj.monthly_change = monthly_change if monthly_change is None else float(monthly_change)
-    else:
-        s.add(CPIActual(date=d, cpi=float(cpi_value),
-                        monthly_change=monthly_change if monthly_change is None else float(monthly_change)))
-
-def delete_backfill_run(s: Session, anchor_ym: str) -> None:
+def upsert_cpi_actuals(s: Session, df: pd.DataFrame) -> UpsertResult:
+    # df: date (date), CPI, Monthly Change
+    rows = pd.DataFrame({
+        "date": df["date"],
+        "cpi": df["CPI"].astype(float),
+        "monthly_change": df["Monthly Change"].astype(float),
+    })
+    return bulk_upsert(s, CPIActual, rows, keys=["date"])
+
+def delete_backfill_runs(s: Session, anchor_yms: Iterable[str]) -> int:
     # Any run created by this script uses notes=f"backfill:{anchor_ym}:..."
-    runs = s.scalars(select(ForecastRun).where(ForecastRun.notes.like(f"backfill:{anchor_ym}:%"))).all()
-    for r in runs:
-        s.execute(delete(ForecastPoint).where(ForecastPoint.run_id == r.id))
-        s.delete(r)
+    runs = select(ForecastRun.id).where(
+        ForecastRun.notes.like("backfill:%"),
+        func.substr(ForecastRun.notes, len("backfill:") + 1, 7).in_(list(anchor_yms)),
+    )
+    s.execute(delete(ForecastPoint).where(ForecastPoint.run_id.in_(runs)))
+    return s.execute(delete(ForecastRun).where(ForecastRun.id.in_(runs))).rowcount
+
+def backfill_forecasts(df_all: pd.DataFrame, start: date, end: date, months: int, window: int) -> pd.DataFrame:
+    """
+    As-of forecasts for every anchor month in [start, end], all at once:
+    one rolling OLS pass over the whole series (same fit as compute_trend on the
+    trailing `window` months), anchored to the actual at each anchor.
+    Returns rows: anchor (date), date (date), predicted_cpi.
+    """
+    y = df_all["CPI"].to_numpy(dtype=float)
+    fit = rolling_ols(y, window)
+    dates = pd.to_datetime(df_all["date"])
+    keep = ((dates.dt.date >= start) & (dates.dt.date <= end)).to_numpy() & (fit.n >= 2)
+    if not keep.any():
+        return pd.DataFrame(columns=["anchor", "date", "predicted_cpi"])
+
+    preds = fit.anchored(y, months)[keep]                       # anchors × months
+    anchors = dates[keep].to_numpy(dtype="datetime64[M]")
+    future = anchors[:, None] + np.arange(1, months + 1)        # month arithmetic
+    return pd.DataFrame({
+        "anchor": np.repeat(anchors, months).astype("datetime64[D]").astype(object),
+        "date": future.ravel().astype("datetime64[D]").astype(object),
+        "predicted_cpi": preds.ravel(),
+    })
 
 def main():
     ap = argparse.ArgumentParser(description="Backfill CPI actuals + as-of forecasts by month.")
@@ -59,7 +75,7 @@ def main():
     end   = parse_ym(args.end)
 
     # Make sure tables exist
-    Base.metadata.create_all(bind=engine)
+    init_db()
 
     # Load full CPI data once
     src = fetch_cpi_data()
@@ -71,53 +87,35 @@ def main():
     # Normalize dates to date()
     df_all["date"] = df_all["date"].dt.date
 
-    count_runs = 0
+    t0 = time.perf_counter()
+    points = backfill_forecasts(df_all, start, end, args.months, args.window)
+    anchors = sorted(points["anchor"].unique())
+    anchor_yms = [f"{a.year:04d}-{a.month:02d}" for a in anchors]
+    print(f"Computed {len(anchors)} as-of forecasts in {time.perf_counter() - t0:.3f}s")
+
+    # one transaction for actuals, overwrites, runs and points
     with SessionLocal() as s:
-        for anchor in month_iter(start, end):
-            # find the row for this month
-            row = df_all.loc[df_all["date"] == anchor]
-            if row.empty:
-                # skip months not in source
-                continue
-
-            cpi_val = float(row["CPI"].iloc[0])
-            mc = row["Monthly Change"].iloc[0]
-            monthly_change = None if (mc != mc) else float(mc)  # NaN-safe
-
-            # upsert actual for anchor month
-            upsert_cpi_actual(s, anchor, cpi_val, monthly_change)
-
-            # windowed training data: <= anchor, last N
-            df_hist = df_all[df_all["date"] <= anchor].tail(args.window).reset_index(drop=True)
-            if len(df_hist) < 2:
-                # need at least 2 points for regression
-                continue
-
-            # forecast and store as a run
-            anchor_ym = f"{anchor.year:04d}-{anchor.month:02d}"
-            if args.overwrite:
-                delete_backfill_run(s, anchor_ym)
-
-            run = ForecastRun(
-                months_predict=args.months,
-                notes=f"backfill:{anchor_ym}:linear_reg_{args.window}m"
-            )
-            s.add(run); s.flush()
-
-            _model, future = compute_trend(df_hist, months_predict=args.months)
-            for d, yhat in future:
-                s.add(ForecastPoint(
-                    run_id=run.id,
-                    date=d.date(),
-                    predicted_cpi=float(yhat),
-                ))
-
-            count_runs += 1
-            # commit per anchor to avoid big transactions
-            s.commit()
-            print(f"✓ {anchor_ym}: stored actual + forecast ({args.months}m)")
-
-    print(f"Done. Created {count_runs} forecast runs.")
+        in_range = df_all[(df_all["date"] >= start) & (df_all["date"] <= end)]
+        print(f"CPI actuals: {upsert_cpi_actuals(s, in_range)}")
+
+        if args.overwrite and anchor_yms:
+            print(f"Removed {delete_backfill_runs(s, anchor_yms)} existing backfill runs")
+
+        run_ids = s.scalars(
+            insert(ForecastRun).returning(ForecastRun.id, sort_by_parameter_order=True),
+            [{"months_predict": args.months, "notes": f"backfill:{ym}:linear_reg_{args.window}m"}
+             for ym in anchor_yms],
+        ).all() if anchor_yms else []
+
+        if run_ids:
+            run_by_anchor = dict(zip(anchors, run_ids))
+            s.execute(insert(ForecastPoint), [
+                {"run_id": run_by_anchor[a], "date": d, "predicted_cpi": float(v)}
+                for a, d, v in points.itertuples(index=False)
+            ])
+        s.commit()
+
+    print(f"Done. Created {len(run_ids)} forecast runs.")
 
 if __name__ == "__main__":
     main()
@@ -4,7 +4,7 @@ import pandas as pd
 
 from sqlalchemy.orm import Session
 from cpi_app.models import (
-    Base, engine,
+    engine, init_db, bulk_upsert,
     BCIActual, BCIForecastRun, BCIForecastPoint,
     PPIActual, PPIForecastRun, PPIForecastPoint,
 )
@@ -24,20 +24,24 @@ def _parse_date(ym: str):
     except ValueError:
         return None
 
+def _historical_rows(ds, cats):
+    rows = []
+    for cat in cats:
+        for ym, v in ds.get_historical_values(cat, months=10000):
+            d = _parse_date(ym)
+            if d is None or v is None:
+                continue
+            rows.append({"date": d, "category": cat, "index_value": float(v)})
+    return rows
+
 def backfill_bci(session: Session):
     client = APIClient(base_url="https://px.hagstofa.is:443/pxis/api/v1")
     ds = ConstructionPriceIndex(client)
     cats = ds.list_categories() or ["BCI"]
 
     # ---- upsert ALL historical actuals ----
-    for cat in cats:
-        for ym, v in ds.get_historical_values(cat, months=10000):
-            d = _parse_date(ym)
-            if d is None or v is None:
-                continue
-            obj = session.query(BCIActual).filter_by(date=d, category=cat).one_or_none()
-            if obj: obj.index_value = float(v)
-            else:   session.add(BCIActual(date=d, category=cat, index_value=float(v)))
+    res = bulk_upsert(session, BCIActual, _historical_rows(ds, cats), keys=["date", "category"])
+    print(f"BCI actuals: {res}")
 
     # ---- create a single forecast run ----
     run = BCIForecastRun(months_predict=FORECAST_MONTHS, notes="backfill linear_reg_24m")
@@ -59,14 +63,8 @@ def backfill_ppi(session: Session):
     cats = ds.list_categories() or ["PPI"]
 
     # ---- upsert ALL historical actuals ----
-    for cat in cats:
-        for ym, v in ds.get_historical_values(cat, months=10000):
-            d = _parse_date(ym)
-            if d is None or v is None:
-                continue
-            obj = session.query(PPIActual).filter_by(date=d, category=cat).one_or_none()
-            if obj: obj.index_value = float(v)
-            else:   session.add(PPIActual(date=d, category=cat, index_value=float(v)))
+    res = bulk_upsert(session, PPIActual, _historical_rows(ds, cats), keys=["date", "category"])
+    print(f"PPI actuals: {res}")
 
     # ---- create a single forecast run ----
     run = PPIForecastRun(months_predict=FORECAST_MONTHS, notes="backfill linear_reg_24m")
@@ -82,7 +80,7 @@ def backfill_ppi(session: Session):
             session.add(PPIForecastPoint(run_id=run.id, date=d, category=cat, predicted_index=float(yhat)))
 
 def main():
-    Base.metadata.create_all(engine)
+    init_db()
     with Session(engine) as s:
         try:
             backfill_bci(s)
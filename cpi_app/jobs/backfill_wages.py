@@ -2,49 +2,89 @@
 from __future__ import annotations
 
 import argparse
+import time
 from datetime import datetime, date
-from typing import Iterator, List
+from typing import Iterable, List, Tuple
 
+import numpy as np
 import pandas as pd
 from sqlalchemy.orm import Session
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, insert, update, tuple_
 
 from ..models import (
-    Base, engine, SessionLocal,
+    SessionLocal, init_db, bulk_upsert, UpsertResult,
     WageActual, WageForecastRun, WageForecastPoint,
 )
-from ..pipelines.wages import fetch_wage_series, compute_forecast
+from ..pipelines.wages import fetch_wage_panel
+from ..pipelines.forecast import rolling_ols
 
 def parse_ym(s: str) -> date:
     return datetime.strptime(s, "%Y-%m").date()
 
-def month_iter(start: date, end: date) -> Iterator[date]:
-    y, m = start.year, start.month
-    while True:
-        d = date(y, m, 1)
-        if d > end:
-            break
-        yield d
-        m += 1
-        if m == 13:
-            m = 1
-            y += 1
-
-def upsert_wage_actual(s: Session, d: date, category: str, value: float) -> None:
-    obj = s.query(WageActual).filter_by(date=d, category=category).one_or_none()
-    if obj:
-        obj.index_value = float(value)
-    else:
-        s.add(WageActual(date=d, category=category, index_value=float(value)))
-
-def delete_backfill_run(s: Session, anchor_ym: str, category: str) -> None:
-    # runs created here use notes=f"backfill:{category}:{anchor_ym}:..."
-    runs = s.scalars(
-        select(WageForecastRun).where(WageForecastRun.notes.like(f"backfill:{category}:{anchor_ym}:%"))
+def upsert_wage_actuals(s: Session, category: str, series: pd.Series) -> UpsertResult:
+    # series: values indexed by date
+    rows = pd.DataFrame({"date": list(series.index), "category": category,
+                         "index_value": series.astype(float).values})
+    return bulk_upsert(s, WageActual, rows, keys=["date", "category"])
+
+def label_legacy_runs(s: Session) -> int:
+    # runs written before category/anchor existed only carry them in notes="backfill:{category}:{YYYY-MM}:..."
+    rows = s.execute(
+        select(WageForecastRun.id, WageForecastRun.notes)
+        .where(WageForecastRun.notes >= "backfill:", WageForecastRun.notes < "backfill;",
+               WageForecastRun.anchor.is_(None))
     ).all()
-    for r in runs:
-        s.execute(delete(WageForecastPoint).where(WageForecastPoint.run_id == r.id))
-        s.delete(r)
+    fill = []
+    for rid, notes in rows:
+        parts = notes.split(":")
+        try:
+            fill.append({"id": rid, "category": parts[1], "anchor": parse_ym(parts[2])})
+        except (IndexError, ValueError):
+            continue
+    if fill:
+        s.execute(update(WageForecastRun), fill)
+    return len(fill)
+
+def delete_backfill_runs(s: Session, keys: Iterable[Tuple[str, date]]) -> int:
+    # one keyed delete per table over the (category, anchor) index
+    runs = (select(WageForecastRun.id)
+            .where(tuple_(WageForecastRun.category, WageForecastRun.anchor).in_(list(keys)))
+            .scalar_subquery())
+    s.execute(delete(WageForecastPoint).where(WageForecastPoint.run_id.in_(runs)))
+    return s.execute(delete(WageForecastRun).where(WageForecastRun.id.in_(runs))).rowcount
+
+def backfill_forecasts(panel: pd.DataFrame, start: date, end: date, months: int, window: int) -> pd.DataFrame:
+    """
+    As-of forecasts for every (category, anchor month in [start, end]).
+    One rolling OLS pass per category over all anchors (same fit as compute_forecast
+    on the trailing `window` observations), anchored to the actual.
+    Returns rows: category, anchor (date), date (date), predicted_index.
+    """
+    frames = []
+    for cat in panel.columns:
+        s = panel[cat].dropna()
+        if len(s) < 2:
+            continue
+        when = s.index.values.astype("datetime64[D]")
+        y = s.to_numpy(dtype=float)
+        fit = rolling_ols(y, window)
+
+        keep = (when >= np.datetime64(start)) & (when <= np.datetime64(end)) & (fit.n >= 2)
+        if not keep.any():
+            continue
+        anchors = when[keep]
+        future = (anchors.astype("datetime64[M]")[:, None] + np.arange(1, months + 1)).astype("datetime64[D]")
+        preds = fit.anchored(y, months)[keep]  # anchors × months
+
+        frames.append(pd.DataFrame({
+            "category": cat,
+            "anchor": np.repeat(anchors, months).astype(object),
+            "date": future.ravel().astype(object),
+            "predicted_index": preds.ravel(),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["category", "anchor", "date", "predicted_index"])
+    return pd.concat(frames, ignore_index=True)
 
 def main():
     ap = argparse.ArgumentParser(description="Backfill wage index actuals + as-of forecasts by month.")
@@ -62,60 +102,49 @@ def main():
     cats: List[str] = [c.strip() for c in args.categories.split(",") if c.strip()]
 
     # Ensure tables
-    Base.metadata.create_all(bind=engine)
+    init_db()
 
+    # load every requested category from a single download
+    panel = fetch_wage_panel(cats)  # DatetimeIndex × category
+    for cat in cats:
+        if cat not in panel.columns or panel[cat].dropna().empty:
+            print(f"Category {cat}: no data. Skipping.")
+
+    t0 = time.perf_counter()
+    points = backfill_forecasts(panel, start, end, args.months, args.window)
+    runs = points[["category", "anchor"]].drop_duplicates().itertuples(index=False, name=None)
+    runs = [(cat, a, f"{a.year:04d}-{a.month:02d}") for cat, a in runs]
+    print(f"Computed {len(runs)} as-of forecasts in {time.perf_counter() - t0:.3f}s")
+
+    # one transaction: actuals, overwrites, runs, points
     with SessionLocal() as s:
-        total_runs = 0
-        for cat in cats:
-            # load full series for this category once
-            series = fetch_wage_series(cat)  # pandas Series indexed by Timestamp
-            if series.empty:
-                print(f"Category {cat}: no data. Skipping.")
-                continue
-            # normalize index to date()
-            series.index = pd.to_datetime(series.index).date
-
-            for anchor in month_iter(start, end):
-                if anchor not in series.index:
-                    # no actual for this month
-                    continue
-
-                # upsert actual
-                upsert_wage_actual(s, anchor, cat, float(series.loc[anchor]))
-
-                # windowed history ≤ anchor
-                hist = series[series.index <= anchor]
-                if len(hist) < 2:
-                    continue
-                if len(hist) > args.window:
-                    hist = hist[-args.window:]
-
-                # overwrite if requested
-                anchor_ym = f"{anchor.year:04d}-{anchor.month:02d}"
-                if args.overwrite:
-                    delete_backfill_run(s, anchor_ym, cat)
-
-                # create run and store forecast
-                run = WageForecastRun(
-                    months_predict=args.months,
-                    notes=f"backfill:{cat}:{anchor_ym}:linear_reg_{args.window}m",
-                )
-                s.add(run); s.flush()
-
-                fut = compute_forecast(hist, months=args.months, window=len(hist))
-                for d, yhat in fut:
-                    s.add(WageForecastPoint(
-                        run_id=run.id,
-                        category=cat,
-                        date=d.date(),
-                        predicted_index=float(yhat),
-                    ))
-
-                s.commit()
-                total_runs += 1
-                print(f"✓ {cat} {anchor_ym}: stored actual + forecast ({args.months}m)")
-
-        print(f"Done. Created {total_runs} wage forecast runs.")
+        in_range = panel[(panel.index >= pd.Timestamp(start)) & (panel.index <= pd.Timestamp(end))]
+        for cat in in_range.columns:
+            series = in_range[cat].dropna()
+            series.index = series.index.date
+            print(f"{cat} actuals: {upsert_wage_actuals(s, cat, series)}")
+
+        if args.overwrite and runs:
+            label_legacy_runs(s)
+            removed = delete_backfill_runs(s, [(cat, a) for cat, a, _ym in runs])
+            print(f"Removed {removed} existing backfill runs")
+
+        run_ids = s.scalars(
+            insert(WageForecastRun).returning(WageForecastRun.id, sort_by_parameter_order=True),
+            [{"months_predict": args.months, "category": cat, "anchor": a,
+              "notes": f"backfill:{cat}:{ym}:linear_reg_{args.window}m"}
+             for cat, a, ym in runs],
+        ).all() if runs else []
+
+        if run_ids:
+            run_by_key = {(cat, a): rid for (cat, a, _ym), rid in zip(runs, run_ids)}
+            s.execute(insert(WageForecastPoint), [
+                {"run_id": run_by_key[(cat, a)], "category": cat, "date": d, "predicted_index": float(v)}
+                for cat, a, d, v in points.itertuples(index=False)
+            ])
+        s.commit()
+
+    print(f"Done. Created {len(run_ids)} wage forecast runs.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,40 @@
+# cpi_app/jobs/backtest_models.py
+"""
+Rolling-origin backtest of every forecast model on every ISNR sub-index.
+
+    python -m cpi_app.jobs.backtest_models --months 12 --anchors 120 --workers 4
+
+Prints mean MAPE per model and how many codes each model wins; --out writes
+the full (code, model, horizon) score table as CSV. Nothing is stored.
+"""
+import argparse
+
+from cpi_app.pipelines.cpi import fetch_cpi_data, isnr_panel
+from cpi_app.pipelines.backtest import backtest
+from cpi_app.pipelines.forecast import MODELS
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Backtest forecast models on all ISNR sub-indices.")
+    ap.add_argument("--months", type=int, default=12, help="Forecast horizon (default 12)")
+    ap.add_argument("--anchors", type=int, default=120, help="Score the last N anchor months (default 120)")
+    ap.add_argument("--models", default=",".join(MODELS), help="Comma-separated model names (default all)")
+    ap.add_argument("--workers", type=int, default=None, help="Processes to score with (default in-process)")
+    ap.add_argument("--out", default=None, help="Write the full score table to this CSV")
+    args = ap.parse_args()
+
+    panel = isnr_panel(fetch_cpi_data())
+    bt = backtest(panel, models=[m.strip() for m in args.models.split(",") if m.strip()],
+                  months=args.months, anchors=args.anchors, workers=args.workers)
+
+    summary = bt.summary("mape")
+    wins = summary.idxmin(axis=1).value_counts()
+    table = summary.mean().to_frame("mean_mape").join(wins.rename("wins")).fillna({"wins": 0}).astype({"wins": int})
+    print(table.sort_values("mean_mape").to_string(float_format="%.3f"))
+    if args.out:
+        bt.scores.to_csv(args.out, index=False)
+        print(f"Wrote {len(bt.scores)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
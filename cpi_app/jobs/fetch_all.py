@@ -4,266 +4,387 @@
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+import re
 from datetime import datetime, timezone, date
+import numpy as np
 import pandas as pd
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-from dateutil.relativedelta import relativedelta
-from ..models import CPISubMetric
 
 from ..models import (
-    SessionLocal, Base, engine,
-    CPIActual, ForecastRun, ForecastPoint,
-    WageActual, WageForecastRun, WageForecastPoint,
+    init_db, bulk_upsert, UpsertResult,
+    CPIActual, ForecastRun, ForecastPoint, CPISubMetric, CPICore,
+    CPISubForecastRun, CPISubForecastPoint,
+    WageActual, WageForecastRun, WageForecastPoint, RealWageActual,
+    BCIActual, BCIForecastRun, BCIForecastPoint,
+    PPIActual, PPIForecastRun, PPIForecastPoint,
 )
-
-from ..models import (
-  # existing…
-  BCIActual, BCIForecastRun, BCIForecastPoint,
-  PPIActual, PPIForecastRun, PPIForecastPoint,
-)
-from ..pipelines.bci import fetch_bci_series as fetch_bci, compute_forecast as bci_forecast
-from ..pipelines.ppi import fetch_ppi_series as fetch_ppi, compute_forecast as ppi_forecast
+from .stages import Stage, run_stages, write_session, content_hash, latest_input_hash
+from .accuracy import update_accuracy
+from ..pipelines.bci import fetch_bci_series as fetch_bci
+from ..pipelines.ppi import fetch_ppi_series as fetch_ppi
+from ..pipelines.forecast import BAND_COLUMNS, bootstrap_intervals, forecast_frame
+from ..pipelines.backtest import best_model_forecast
 
 
 from ..pipelines.cpi import (
     fetch_cpi_data,            # returns CPI source object (Hagstofan-backed)
     parse_data as parse_cpi,   # -> DataFrame: ['date', 'CPI', 'Monthly Change']
     compute_trend as cpi_trend, # -> (model, [(date, yhat), ...])
-    list_isnr, isnr_label, get_isnr_series    
+    isnr_label,
+    isnr_panel,                # -> DataFrame (DatetimeIndex × ISNR code)
+    sub_metrics, weights_panel, SUB_METRIC_COLUMNS,
+    core_inflation,
+    bottom_up_forecast,
 )
 
 from ..pipelines.wages import (
-    fetch_wage_series,         # -> pandas Series (DatetimeIndex) for a category
-    compute_forecast as wages_forecast
+    fetch_wage_panel,          # -> DataFrame (DatetimeIndex × category), one download
+    real_wages,                # wage panel deflated by CPI -> tidy real index + YoY
 )
 
 # ---------- CPI helpers ----------
 
-# Curated ISNR codes to always surface
-CPI_CURATED = [
-    "IS011",      # Matur
-    "IS041",      # Greidd húsaleiga
-    "IS042",      # Reiknuð húsaleiga
-    "IS0451",     # Rafmagn
-    "IS0455",     # Hiti
-    "IS06",       # Heilsa
-    "IS0722",     # Bensín og olíur
-    "IS111",      # Veitingar
-]
+def upsert_cpi(s: Session, df: pd.DataFrame) -> UpsertResult:
+    rows = pd.DataFrame({
+        "date": pd.to_datetime(df["date"]).dt.date,
+        "cpi": df["CPI"].astype(float),
+        "monthly_change": df["Monthly Change"].astype(float),
+    })
+    return bulk_upsert(s, CPIActual, rows, keys=["date"])
 
-def upsert_cpi(s: Session, df: pd.DataFrame) -> None:
-    for _, r in df.iterrows():
-        obj = s.query(CPIActual).filter_by(date=r["date"].date()).one_or_none()
-        monthly_change = None if pd.isna(r.get("Monthly Change")) else float(r.get("Monthly Change"))
-        if obj:
-            obj.cpi = float(r["CPI"])
-            obj.monthly_change = monthly_change
-        else:
-            s.add(CPIActual(
-                date=r["date"].date(),
-                cpi=float(r["CPI"]),
-                monthly_change=monthly_change,
-            ))
-
-def save_cpi_forecast(s: Session, df24: pd.DataFrame, months: int = 6) -> None:
-    run = ForecastRun(months_predict=months, notes="linear_reg_24m")
+def _bands(row) -> dict:
+    """lo80/hi80/lo95/hi95 of a forecast row as column values (None where undefined)."""
+    return {k: None if pd.isna(v) else float(v) for k in BAND_COLUMNS for v in [getattr(row, k)]}
+
+def save_cpi_forecast(s: Session, df24: pd.DataFrame, months: int = 6, input_hash: str | None = None) -> None:
+    run = ForecastRun(months_predict=months, notes="linear_reg_24m", input_hash=input_hash)
     s.add(run); s.flush()
     futures = cpi_trend(df24, months_predict=months)[1]
-    for d, yhat in futures:
-        s.add(ForecastPoint(run_id=run.id, date=d.date(), predicted_cpi=float(yhat)))
-
-def _pct(curr, prev):
-    if curr is None or prev in (None, 0):
-        return None
-    return (curr / prev - 1.0) * 100.0
-
-def _yyyymm(dt):
-    return dt.strftime("%Y-%m")
+    if not futures:
+        return
+    fut = pd.DataFrame(futures, columns=["date", "value"])
+    bands = bootstrap_intervals(df24["CPI"].astype(float).to_numpy(), fut["value"].to_numpy())
+    fut = fut.assign(**{k: v[0] for k, v in bands.items()})
+    for r in fut.itertuples(index=False):
+        s.add(ForecastPoint(run_id=run.id, date=r.date.date(), predicted_cpi=float(r.value), **_bands(r)))
 
-def upsert_latest_cpi_sub_metrics(session):
+def save_cpi_sub_forecast(s: Session, src, months: int = 6, input_hash: str | None = None) -> pd.DataFrame:
     """
-    For the latest CPI month in CPIActual, compute MoM/YoY and deltas vs total CPI
-    for all top-level IS codes (IS01.., IS02..) and curated fine-grained codes.
-    Upsert into cpi_sub_metrics (one row per code for that month).
+    Forecast every ISNR code in the source with the model that backtested best on
+    it over the last 5 years (all codes in one pass per model).
+    Returns the stored forecasts (tidy code/date/value/model plus bands).
     """
-    # 1) What is the latest month we have in CPIActual?
-    from ..models import CPIActual
-    latest = session.query(CPIActual).order_by(CPIActual.date.desc()).first()
-    if not latest:
-        return
-    last_dt = latest.date
-    prev_dt = last_dt - relativedelta(months=1)
-    prev12_dt = last_dt - relativedelta(months=12)
-
-    # Build quick dict of total CPI values by YYYY-MM for MoM/YoY deltas
-    all_actuals = session.query(CPIActual).order_by(CPIActual.date).all()
-    total_by_key = {_yyyymm(a.date): a.cpi for a in all_actuals}
-
-    last_key, prev_key, prev12_key = _yyyymm(last_dt), _yyyymm(prev_dt), _yyyymm(prev12_dt)
-    total_mom = _pct(total_by_key.get(last_key), total_by_key.get(prev_key))
-    total_yoy = _pct(total_by_key.get(last_key), total_by_key.get(prev12_key))
-
-    # 2) Pull Hagstofan CPI source once
-    src = fetch_cpi_data()
-    all_codes = list_isnr(src)
-
-    if any(c.startswith("IS") for c in all_codes):
-        top_level = sorted([c for c in all_codes if c.startswith("IS") and len(c) == 4 and c != "IS00"])
-        curated = [c for c in CPI_CURATED if c in all_codes]
-    else:
-        top_level = sorted([c for c in all_codes if c.startswith("CP") and len(c) == 4 and c != "CP00"])
-        curated = []
-
-    target_codes = sorted(set(top_level).union(curated))
-
-    # 3) For each code, get its series, compute value/MoM/YoY for latest month, upsert
-    for code in target_codes:
-        df = get_isnr_series(src, code)  # columns: date, value, Monthly Change (maybe)
-        by_key = {_yyyymm(d): float(v) for d, v in zip(df["date"], df["value"])}
-
-        val = by_key.get(last_key)
-        mom = _pct(by_key.get(last_key), by_key.get(prev_key))
-        yoy = _pct(by_key.get(last_key), by_key.get(prev12_key))
-
-        delta_mom = None if (mom is None or total_mom is None) else (mom - total_mom)
-        delta_yoy = None if (yoy is None or total_yoy is None) else (yoy - total_yoy)
-
-        label = isnr_label(code) or code
-
-        # UPSERT row (date+code unique)
-        obj = session.query(CPISubMetric).filter_by(date=last_dt, code=code).one_or_none()
-        if obj:
-            obj.label = label
-            obj.value = val
-            obj.mom = mom
-            obj.yoy = yoy
-            obj.delta_mom_vs_total = delta_mom
-            obj.delta_yoy_vs_total = delta_yoy
-        else:
-            session.add(CPISubMetric(
-                date=last_dt, code=code, label=label,
-                value=val, mom=mom, yoy=yoy,
-                delta_mom_vs_total=delta_mom, delta_yoy_vs_total=delta_yoy
-            ))
+    fut = best_model_forecast(isnr_panel(src), months, anchors=60, intervals=True)
+    run = CPISubForecastRun(months_predict=months, notes="best_of_backtest", input_hash=input_hash)
+    s.add(run); s.flush()
+    rows = [
+        {"run_id": run.id, "date": r.date.date(), "code": r.code,
+         "model": r.model, "predicted_index": float(r.value), **_bands(r)}
+        for r in fut.itertuples(index=False)
+    ]
+    if rows:
+        s.execute(CPISubForecastPoint.__table__.insert(), rows)
+    return fut
+
+def save_cpi_bottom_up_forecast(s: Session, src, leaf_forecast: pd.DataFrame, months: int = 6) -> int:
+    """
+    Headline CPI aggregated from the leaf sub-index forecasts with the latest
+    weights at last-actual prices, stored as a ForecastRun (notes "bottom_up:...") next to the top-down
+    trend. Carries no input_hash, so stage_cpi keys off the top-down run only.
+    """
+    fut = bottom_up_forecast(isnr_panel(src), weights_panel(src), leaf_forecast)
+    fut = fut.head(months)
+    if fut.empty:
+        return 0
+    run = ForecastRun(months_predict=months, notes="bottom_up:best_of_backtest")
+    s.add(run); s.flush()
+    for d, yhat in fut.itertuples(index=False):
+        s.add(ForecastPoint(run_id=run.id, date=d.date(), predicted_cpi=float(yhat)))
+    return len(fut)
+
+def _changed_rows(new: pd.DataFrame, stored: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    """Rows of `new` that are missing from `stored` or differ from it in any other column."""
+    cols = [c for c in new.columns if c not in keys]
+    m = new.merge(stored, on=keys, how="left", suffixes=("", "_old"), indicator=True)
+    same = m["_merge"].eq("both").to_numpy()
+    for c in cols:
+        a = m[c].to_numpy(dtype=float)
+        b = m[f"{c}_old"].to_numpy(dtype=float)
+        same &= np.isclose(a, b, rtol=1e-9, atol=1e-12, equal_nan=True)
+    return new.loc[~same]
+
+def _sub_index_inputs(session, src) -> tuple[pd.DataFrame, pd.Series]:
+    """(ISNR panel without the total codes, headline CPI from cpi_actuals) on month starts."""
+    total = pd.Series(dict(session.execute(select(CPIActual.date, CPIActual.cpi)).all()), dtype=float)
+    total.index = pd.to_datetime(total.index)
+    panel = isnr_panel(src)
+    panel = panel.drop(columns=[c for c in panel.columns if re.match(r"^(IS|CP)00$|^CPI$", c)])
+    return panel, total
+
+def upsert_cpi_sub_metrics(session, src=None) -> UpsertResult:
+    """
+    Value, MoM/YoY and deltas vs total CPI for every (month, ISNR code) in the source,
+    computed in one pass over the panel matrix. Only new or changed rows are written:
+    a revised month also moves the next month's MoM and the YoY a year on, and those
+    rows show up in the comparison with what is stored.
+    `src` is an already fetched CPI source; fetched here if not given.
+    """
+    src = src or fetch_cpi_data()
+    panel, total = _sub_index_inputs(session, src)
+    if total.empty:
+        return UpsertResult()
+    df = sub_metrics(panel, total, weights_panel(src))
+    df["date"] = df["date"].dt.date
+
+    M = CPISubMetric
+    stored = pd.DataFrame(
+        session.execute(select(M.date, M.code, *[M.__table__.c[c] for c in SUB_METRIC_COLUMNS])).all(),
+        columns=["date", "code", *SUB_METRIC_COLUMNS],
+    )
+    changed = _changed_rows(df, stored, keys=["date", "code"])
+    changed = changed.assign(label=changed["code"].map(lambda c: isnr_label(c) or c))
+    return bulk_upsert(session, M, changed, keys=["date", "code"])
+
+def upsert_cpi_core(session, src=None) -> UpsertResult:
+    """
+    Trimmed mean, weighted median and exclusion cores for every month (see
+    core_inflation), written where new or changed.
+    """
+    src = src or fetch_cpi_data()
+    panel, total = _sub_index_inputs(session, src)
+    weights = weights_panel(src)
+    if total.empty or weights.empty:
+        return UpsertResult()
+    df = core_inflation(panel, total, weights)
+    df["date"] = df["date"].dt.date
+
+    cols = ["index_value", "mom", "yoy"]
+    stored = pd.DataFrame(
+        session.execute(select(CPICore.date, CPICore.measure, *[CPICore.__table__.c[c] for c in cols])).all(),
+        columns=["date", "measure", *cols],
+    )
+    return bulk_upsert(session, CPICore, _changed_rows(df, stored, keys=["date", "measure"]),
+                       keys=["date", "measure"])
 
 # ---------- Wages helpers (TOTAL) ----------
 
-def make_wage_df_for_category(category: str = "TOTAL") -> pd.DataFrame:
+def make_wage_df(categories: list[str]) -> pd.DataFrame:
     """
-    Returns a tidy DataFrame with columns: ['date','category','value'] for one category.
-    If the series is empty (category not present), returns empty DataFrame.
+    Returns a tidy DataFrame with columns: ['date','category','value'] for the given
+    categories, all taken from a single LAU04000 download.
+    Categories not present in the source are left out.
     """
-    s = fetch_wage_series(category)  # pandas Series with DatetimeIndex
-    if s.empty:
+    panel = fetch_wage_panel(categories)  # DatetimeIndex × category
+    if panel.empty:
         return pd.DataFrame(columns=["date","category","value"])
-    df = s.reset_index()
-    df.columns = ["date", "value"]
-    df["category"] = category
-    return df[["date", "category", "value"]]
-
-def upsert_wages(s: Session, df: pd.DataFrame) -> None:
+    df = panel.rename_axis("date").reset_index().melt(id_vars="date", var_name="category", value_name="value")
+    return df.dropna(subset=["value"])[["date", "category", "value"]].reset_index(drop=True)
+
+def _actuals_rows(df: pd.DataFrame) -> pd.DataFrame:
+    # date, category, value -> columns of the *Actual tables
+    return pd.DataFrame({
+        "date": pd.to_datetime(df["date"]).dt.date,
+        "category": df["category"],
+        "index_value": df["value"].astype(float),
+    })
+
+def upsert_wages(s: Session, df: pd.DataFrame) -> UpsertResult:
     # expects columns: date (Timestamp), category (str), value (float)
-    for d, cat, val in df.itertuples(index=False):
-        d = d.date() if hasattr(d, "date") else d
-        obj = s.query(WageActual).filter_by(date=d, category=cat).one_or_none()
-        if obj:
-            obj.index_value = float(val)
-        else:
-            s.add(WageActual(date=d, category=cat, index_value=float(val)))
-
-def save_wage_forecast(s: Session, df: pd.DataFrame, months: int = 12) -> None:
+    return bulk_upsert(s, WageActual, _actuals_rows(df), keys=["date", "category"])
+
+def upsert_real_wages(s: Session) -> UpsertResult:
+    """
+    Real wage index and YoY for every stored wage category and month, from
+    wage_actuals and cpi_actuals; only new or changed rows are written.
+    """
+    wages = pd.DataFrame(s.execute(select(WageActual.date, WageActual.category, WageActual.index_value)).all(),
+                         columns=["date", "category", "value"])
+    cpi = pd.Series(dict(s.execute(select(CPIActual.date, CPIActual.cpi)).all()), dtype=float)
+    if wages.empty or cpi.empty:
+        return UpsertResult()
+    panel = wages.pivot(index="date", columns="category", values="value")
+    panel.index = pd.to_datetime(panel.index)
+    cpi.index = pd.to_datetime(cpi.index)
+    df = real_wages(panel, cpi)
+    df["date"] = df["date"].dt.date
+
+    stored = pd.DataFrame(
+        s.execute(select(RealWageActual.date, RealWageActual.category,
+                         RealWageActual.index_value, RealWageActual.yoy)).all(),
+        columns=["date", "category", "index_value", "yoy"],
+    )
+    changed = _changed_rows(df, stored, keys=["date", "category"])
+    return bulk_upsert(s, RealWageActual, changed, keys=["date", "category"])
+
+def save_wage_forecast(s: Session, df: pd.DataFrame, months: int = 12, input_hash: str | None = None) -> None:
     """
     For each category present in df, fit a 24-month linear model (anchored) and store 12 future points.
     """
     if df.empty:
         return
-    run = WageForecastRun(months_predict=months, notes="linear_reg_24m")
+    run = WageForecastRun(months_predict=months, notes="linear_reg_24m", input_hash=input_hash)
     s.add(run); s.flush()
-    for cat, sub in df.groupby("category"):
-        ser = sub.set_index("date")["value"].astype(float)
-        fut = wages_forecast(ser, months=months)  # -> [(Timestamp, yhat), ...]
-        for d, yhat in fut:
-            s.add(WageForecastPoint(
-                run_id=run.id,
-                date=d.date(),
-                category=cat,
-                predicted_index=float(yhat),
-            ))
+    fut = forecast_frame(df, months, window=24, anchored=True, intervals=True)  # all categories in one fit
+    for r in fut.itertuples(index=False):
+        s.add(WageForecastPoint(
+            run_id=run.id,
+            date=r.date.date(),
+            category=r.category,
+            predicted_index=float(r.value),
+            **_bands(r),
+        ))
 
 def upsert_bci(s, df):
     # df: date, category, value
-    for d, cat, val in df.itertuples(index=False):
-        obj = s.query(BCIActual).filter_by(date=d, category=cat).one_or_none()
-        if obj: obj.index_value = float(val)
-        else:   s.add(BCIActual(date=d, category=cat, index_value=float(val)))
+    return bulk_upsert(s, BCIActual, _actuals_rows(df), keys=["date", "category"])
 
-def save_bci_forecast(s, df, months=6):
-    run = BCIForecastRun(months_predict=months, notes="linear_reg_24m")
+def save_bci_forecast(s, df, months=6, input_hash=None):
+    run = BCIForecastRun(months_predict=months, notes="linear_reg_24m", input_hash=input_hash)
     s.add(run); s.flush()
-    for cat, sub in df.groupby("category"):
-        ser = sub.set_index("date")["value"]
-        for d, yhat in bci_forecast(ser, months=months):
-            s.add(BCIForecastPoint(run_id=run.id, date=d, category=cat, predicted_index=float(yhat)))
+    fut = forecast_frame(df, months, window=24, anchored=False, min_obs=2, intervals=True)
+    for r in fut.itertuples(index=False):
+        s.add(BCIForecastPoint(run_id=run.id, date=r.date.date(), category=r.category,
+                                 predicted_index=float(r.value), **_bands(r)))
 
 def upsert_ppi(s, df):
-    for d, cat, val in df.itertuples(index=False):
-        obj = s.query(PPIActual).filter_by(date=d, category=cat).one_or_none()
-        if obj: obj.index_value = float(val)
-        else:   s.add(PPIActual(date=d, category=cat, index_value=float(val)))
+    return bulk_upsert(s, PPIActual, _actuals_rows(df), keys=["date", "category"])
 
-def save_ppi_forecast(s, df, months=6):
-    run = PPIForecastRun(months_predict=months, notes="linear_reg_24m")
+def save_ppi_forecast(s, df, months=6, input_hash=None):
+    run = PPIForecastRun(months_predict=months, notes="linear_reg_24m", input_hash=input_hash)
     s.add(run); s.flush()
-    for cat, sub in df.groupby("category"):
-        ser = sub.set_index("date")["value"]
-        for d, yhat in ppi_forecast(ser, months=months):
-            s.add(PPIForecastPoint(run_id=run.id, date=d, category=cat, predicted_index=float(yhat)))
+    fut = forecast_frame(df, months, window=24, anchored=False, min_obs=2, intervals=True)
+    for r in fut.itertuples(index=False):
+        s.add(PPIForecastPoint(run_id=run.id, date=r.date.date(), category=r.category,
+                                 predicted_index=float(r.value), **_bands(r)))
+
+
+# ---------- stages ----------
+# Each stage hashes its normalized input and stores it on the run it creates.
+# If the newest run already carries that hash, nothing changed upstream and the
+# stage skips upserts, forecasting and run creation (and returns None).
+
+def _unchanged(s: Session, run_model, h: str, label: str) -> bool:
+    if latest_input_hash(s, run_model) == h:
+        print(f"{label}: source unchanged ({h[:12]}), skipping")
+        return True
+    return False
+
+def _tidy(index: dict, value: str = "value") -> pd.DataFrame:
+    # {(YYYYMmm, code): v} -> rows for content_hash
+    return pd.DataFrame([(ym, c, v) for (ym, c), v in index.items()], columns=["ym", "code", value])
+
+def _cpi_hash(cpi_src) -> str:
+    return content_hash(_tidy(cpi_src.index), _tidy(cpi_src.weights, "weight"))
+
+def stage_cpi(_upstream):
+    cpi_src = fetch_cpi_data()
+    cpi_df  = parse_cpi(cpi_src)
+    h = _cpi_hash(cpi_src)
+    with write_session() as s:
+        if _unchanged(s, ForecastRun, h, "CPI"):
+            # downstream CPI stages check their own state (sub-index hash, stored metrics)
+            return cpi_src
+        print(f"CPI actuals: {upsert_cpi(s, cpi_df)}")
+        save_cpi_forecast(s, cpi_df.tail(24).reset_index(drop=True), months=6, input_hash=h)
+    return cpi_src
+
+def stage_cpi_sub_metrics(upstream):
+    # reads the CPI actuals written by stage_cpi, reuses its source
+    if upstream["cpi"] is None:
+        return
+    with write_session() as s:
+        print(f"CPI sub-metrics: {upsert_cpi_sub_metrics(s, upstream['cpi'])}")
 
+def stage_cpi_core(upstream):
+    if upstream["cpi"] is None:
+        return
+    with write_session() as s:
+        print(f"CPI core inflation: {upsert_cpi_core(s, upstream['cpi'])}")
+
+def stage_cpi_sub_forecast(upstream):
+    cpi_src = upstream["cpi"]
+    if cpi_src is None:
+        return
+    h = _cpi_hash(cpi_src)
+    with write_session() as s:
+        if _unchanged(s, CPISubForecastRun, h, "CPI sub-indices"):
+            return
+        fut = save_cpi_sub_forecast(s, cpi_src, months=6, input_hash=h)
+        print(f"CPI sub-index forecasts: {fut['code'].nunique()} codes")
+        n = save_cpi_bottom_up_forecast(s, cpi_src, fut, months=6)
+        print(f"CPI bottom-up forecast: {n} months")
+
+def stage_wages(_upstream):
+    cats = ["TOTAL", "ALM"]  # add "OPI", "OPI_R", "OPI_L" if you want
+    w_df = make_wage_df(cats)
+    h = content_hash(w_df)
+    with write_session() as s:
+        if _unchanged(s, WageForecastRun, h, "Wages"):
+            return None
+        print(f"Wage actuals: {upsert_wages(s, w_df)}")
+        save_wage_forecast(s, w_df, months=12, input_hash=h)
+    return w_df
+
+def stage_real_wages(_upstream):
+    # from the stored wages and CPI, so it also catches a change on either side alone
+    with write_session() as s:
+        print(f"Real wages: {upsert_real_wages(s)}")
+
+def stage_bci(_upstream):
+    bci_df = fetch_bci(categories=["BCI"])  # add more cats later if desired
+    h = content_hash(bci_df)
+    with write_session() as s:
+        if _unchanged(s, BCIForecastRun, h, "BCI"):
+            return None
+        print(f"BCI actuals: {upsert_bci(s, bci_df)}")
+        save_bci_forecast(s, bci_df, months=6, input_hash=h)
+    return bci_df
+
+def stage_ppi(_upstream):
+    ppi_df = fetch_ppi(categories=["PPI"])
+    h = content_hash(ppi_df)
+    with write_session() as s:
+        if _unchanged(s, PPIForecastRun, h, "PPI"):
+            return None
+        print(f"PPI actuals: {upsert_ppi(s, ppi_df)}")
+        save_ppi_forecast(s, ppi_df, months=6, input_hash=h)
+    return ppi_df
+
+def stage_accuracy(_upstream):
+    # incremental: only points that gained or changed an actual
+    with write_session() as s:
+        changed = update_accuracy(s)
+    print("Forecast accuracy: " + ", ".join(f"{k} {v}" for k, v in changed.items()))
+
+STAGES = [
+    Stage("cpi", stage_cpi),
+    Stage("cpi_sub_metrics", stage_cpi_sub_metrics, after=("cpi",)),
+    Stage("cpi_core", stage_cpi_core, after=("cpi",)),
+    Stage("cpi_sub_forecast", stage_cpi_sub_forecast, after=("cpi",)),
+    Stage("wages", stage_wages),
+    Stage("real_wages", stage_real_wages, after=("cpi", "wages")),
+    Stage("bci", stage_bci),
+    Stage("ppi", stage_ppi),
+    Stage("accuracy", stage_accuracy,
+          after=("cpi", "cpi_sub_metrics", "cpi_sub_forecast", "wages", "bci", "ppi")),
+]
 
 # ---------- main ----------
 
 def main():
-    # create tables if needed
-    Base.metadata.create_all(engine)
-
-    s = SessionLocal()
-    try:
-        # --- CPI ---
-        cpi_src = fetch_cpi_data()
-        cpi_df  = parse_cpi(cpi_src)
-        upsert_cpi(s, cpi_df)
-        save_cpi_forecast(s, cpi_df.tail(24).reset_index(drop=True), months=6)
-
-        # --- Wages (multiple categories) ---
-        cats = ["TOTAL", "ALM"]  # add "OPI", "OPI_R", "OPI_L" if you want
-        frames = [make_wage_df_for_category(c) for c in cats]
-        w_df = pd.concat([f for f in frames if not f.empty], ignore_index=True)
-
-        upsert_wages(s, w_df)
-        save_wage_forecast(s, w_df, months=12)
-
-        # --- Sub-CPI metrics for latest month (fast) ---
-        upsert_latest_cpi_sub_metrics(s)
-
-        # --- BCI ---
-        bci_df = fetch_bci(categories=["BCI"])  # add more cats later if desired
-        upsert_bci(s, bci_df)
-        save_bci_forecast(s, bci_df, months=6)
-
-        # --- PPI ---
-        ppi_df = fetch_ppi(categories=["PPI"])
-        upsert_ppi(s, ppi_df)
-        save_ppi_forecast(s, ppi_df, months=6)
-
-        s.commit()
-        print("✅ Stored CPI + wages (TOTAL) + PPI + BCI + forecasts")
-
-    except Exception:
-        s.rollback()
-        raise
-    finally:
-        s.close()
+    # create/upgrade tables if needed
+    init_db()
+
+    results = run_stages(STAGES)
+    for r in results.values():
+        mark = "✓" if r.ok else "✗"
+        print(f"{mark} {r.name} ({r.seconds:.1f}s)" + ("" if r.ok else f": {r.error}"))
+
+    failed = [r.name for r in results.values() if not r.ok]
+    if failed:
+        raise SystemExit(f"Stages failed: {', '.join(failed)}")
+    print("✅ Stored CPI + wages (TOTAL) + PPI + BCI + forecasts")
 
 if __name__ == "__main__":
     main()
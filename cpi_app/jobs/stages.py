@@ -0,0 +1,130 @@
+# cpi_app/jobs/stages.py
+"""
+Tiny stage graph for the ingestion jobs.
+
+Each Stage fetches/computes on its own worker thread as soon as the stages it runs
+`after` have finished, and writes through write_session() in its own transaction.
+Writers are serialized (SQLite allows one at a time); fetching is not.
+A failed stage only takes its dependents down with it.
+
+Stages hash their normalized input with content_hash() and store it on the
+forecast run they create, so an unchanged download can be skipped next time.
+"""
+from __future__ import annotations
+
+import hashlib
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models import SessionLocal
+
+_WRITE_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: Callable[[Dict[str, Any]], Any]   # gets {upstream name: upstream return value}
+    after: Tuple[str, ...] = ()
+
+
+@dataclass
+class StageResult:
+    name: str
+    ok: bool
+    value: Any = None
+    error: Optional[BaseException] = None
+    seconds: float = 0.0
+
+
+@contextmanager
+def write_session() -> Iterator[Session]:
+    """One transaction per block: commit on success, roll back on error."""
+    with _WRITE_LOCK, SessionLocal() as s:
+        try:
+            yield s
+            s.commit()
+        except Exception:
+            s.rollback()
+            raise
+
+
+def content_hash(*frames: pd.DataFrame) -> str:
+    """
+    sha256 over tidy frames, independent of row/column order and float noise
+    beyond 10 significant digits.
+    """
+    h = hashlib.sha256()
+    for frame in frames:
+        cols = sorted(frame.columns, key=str)
+        norm = frame[cols].sort_values(cols).reset_index(drop=True)
+        h.update(norm.to_csv(index=False, float_format="%.10g").encode("utf-8"))
+    return h.hexdigest()
+
+
+def latest_input_hash(s: Session, run_model) -> Optional[str]:
+    """input_hash of the newest hashed run (backfill runs carry none)."""
+    return s.scalar(
+        select(run_model.input_hash)
+        .where(run_model.input_hash.isnot(None))
+        .order_by(run_model.id.desc())
+        .limit(1)
+    )
+
+
+def _timed(stage: Stage, upstream: Dict[str, Any]) -> StageResult:
+    t0 = time.perf_counter()
+    try:
+        value = stage.run(upstream)
+        return StageResult(stage.name, True, value=value, seconds=time.perf_counter() - t0)
+    except Exception as exc:
+        print(f"✗ stage {stage.name} failed:", file=sys.stderr)
+        traceback.print_exc()
+        return StageResult(stage.name, False, error=exc, seconds=time.perf_counter() - t0)
+
+
+def run_stages(stages: Iterable[Stage], max_workers: int = 4) -> Dict[str, StageResult]:
+    """Run `stages` respecting `after`, independent ones concurrently. Returns results by name."""
+    pending = {st.name: st for st in stages}
+    unknown = {d for st in pending.values() for d in st.after if d not in pending}
+    if unknown:
+        raise ValueError(f"Unknown upstream stage(s): {', '.join(sorted(unknown))}")
+
+    results: Dict[str, StageResult] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+        while pending or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, st in list(pending.items()):
+                    if any(d not in results for d in st.after):
+                        continue
+                    del pending[name]
+                    progressed = True
+                    failed = [d for d in st.after if not results[d].ok]
+                    if failed:
+                        results[name] = StageResult(
+                            name, False, error=RuntimeError(f"skipped, upstream failed: {', '.join(failed)}"))
+                        continue
+                    upstream = {d: results[d].value for d in st.after}
+                    running[pool.submit(_timed, st, upstream)] = name
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Stage cycle among: {', '.join(sorted(pending))}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                results[running.pop(fut)] = fut.result()
+    return results
@@ -1,5 +1,10 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, Float, String, Date, DateTime, ForeignKey, UniqueConstraint, select
+import math
+from dataclasses import dataclass
+from datetime import date, datetime
+from sqlalchemy import create_engine, Column, Integer, Float, String, Date, DateTime, ForeignKey, Index, UniqueConstraint, func, select, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -11,6 +16,13 @@ engine = create_engine(f"sqlite:///{DB_FILE}", future=True)
 SessionLocal = sessionmaker(bind=engine, future=True)
 Base = declarative_base()
 
+class PredictionBands:
+    """Bootstrap prediction interval bounds on a forecast point (NULL on older runs)."""
+    lo80 = Column(Float)
+    hi80 = Column(Float)
+    lo95 = Column(Float)
+    hi95 = Column(Float)
+
 # --- CPI ---
 class CPIActual(Base):
     __tablename__ = "cpi_actuals"
@@ -25,11 +37,12 @@ class ForecastRun(Base):
     created_at = Column(DateTime)
     months_predict = Column(Integer)
     notes = Column(String)
+    input_hash = Column(String(64), index=True)  # sha256 of the normalized input series
 
-class ForecastPoint(Base):
+class ForecastPoint(PredictionBands, Base):
     __tablename__ = "forecast_points"
     id = Column(Integer, primary_key=True)
-    run_id = Column(Integer, ForeignKey("forecast_runs.id"), nullable=False)
+    run_id = Column(Integer, ForeignKey("forecast_runs.id"), index=True, nullable=False)
     date = Column(Date, nullable=False)
     predicted_cpi = Column(Float, nullable=False)
 
@@ -47,10 +60,57 @@ class CPISubMetric(Base):
     delta_mom_vs_total = Column(Float)  # mom - total_cpi_mom
     delta_yoy_vs_total = Column(Float)  # yoy - total_cpi_yoy
 
+    weight = Column(Float)            # % of the CPI basket in force that month
+    contrib_mom = Column(Float)       # pp this code adds to headline MoM
+    contrib_yoy = Column(Float)       # pp this code adds to headline YoY
+    children_weight = Column(Float)   # % of this code's weight covered by its sub-codes
+    children_mom = Column(Float)      # weighted MoM of its sub-codes (vs mom: consistency)
+
     __table_args__ = (
         UniqueConstraint("date", "code", name="uq_cpi_sub_metric_date_code"),
     )
 
+# Ranking expressions for "movers"; each has a (date, expression) index so
+# WHERE date = ? ORDER BY <expr> DESC LIMIT k is a short index walk.
+MOVER_METRICS = {
+    "d_yoy": func.abs(CPISubMetric.delta_yoy_vs_total),
+    "d_mom": func.abs(CPISubMetric.delta_mom_vs_total),
+    "contrib_mom": func.abs(CPISubMetric.contrib_mom),
+    "contrib_yoy": func.abs(CPISubMetric.contrib_yoy),
+}
+for _name, _expr in MOVER_METRICS.items():
+    Index(f"ix_cpi_sub_metric_date_{_name}", CPISubMetric.date, _expr)
+
+# Indexes no longer declared above; init_db drops them
+RETIRED_INDEXES = ("ix_cpi_sub_metric_date_contribution",)
+
+class CPICore(Base):
+    __tablename__ = "cpi_core"
+    id = Column(Integer, primary_key=True)
+    date = Column(Date, index=True, nullable=False)
+    measure = Column(String(32), index=True, nullable=False)  # trimmed_mean, weighted_median, ex_food_energy
+    index_value = Column(Float)       # chained from 100 the month before the first change
+    mom = Column(Float)
+    yoy = Column(Float)
+    __table_args__ = (UniqueConstraint("date", "measure", name="uq_cpi_core_date_measure"),)
+
+class CPISubForecastRun(Base):
+    __tablename__ = "cpi_sub_forecast_runs"
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime)
+    months_predict = Column(Integer, nullable=False)
+    notes = Column(String(200))
+    input_hash = Column(String(64), index=True)  # sha256 of the normalized input series
+
+class CPISubForecastPoint(PredictionBands, Base):
+    __tablename__ = "cpi_sub_forecast_points"
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("cpi_sub_forecast_runs.id", ondelete="CASCADE"), index=True, nullable=False)
+    date = Column(Date, nullable=False)
+    code = Column(String(16), index=True, nullable=False)    # IS011, IS041, ...
+    model = Column(String(32), nullable=False, default="linear_reg_24m")
+    predicted_index = Column(Float, nullable=False)
+
 # --- Wages ---
 class WageActual(Base):
     __tablename__ = "wage_actuals"
@@ -60,17 +120,31 @@ class WageActual(Base):
     index_value = Column(Float, nullable=False)
     __table_args__ = (UniqueConstraint("date", "category", name="uq_wage_date_cat"),)
 
+class RealWageActual(Base):
+    __tablename__ = "real_wage_actuals"
+    id = Column(Integer, primary_key=True)
+    date = Column(Date, index=True, nullable=False)
+    category = Column(String(16), index=True, nullable=False)
+    index_value = Column(Float, nullable=False)   # wage / CPI, 100 in the category's first month
+    yoy = Column(Float)                          # % real change vs 12 months earlier
+    __table_args__ = (UniqueConstraint("date", "category", name="uq_real_wage_date_cat"),)
+
 class WageForecastRun(Base):
     __tablename__ = "wage_forecast_runs"
     id = Column(Integer, primary_key=True)
     created_at = Column(DateTime)
     months_predict = Column(Integer)
-    notes = Column(String)
+    notes = Column(String, index=True)
+    input_hash = Column(String(64), index=True)  # sha256 of the normalized input series
+    # backfill runs only: the (category, anchor month) they forecast from, so overwrites are one keyed delete
+    category = Column(String(16))
+    anchor = Column(Date)
+    __table_args__ = (Index("ix_wage_forecast_run_cat_anchor", "category", "anchor"),)
 
-class WageForecastPoint(Base):
+class WageForecastPoint(PredictionBands, Base):
     __tablename__ = "wage_forecast_points"
     id = Column(Integer, primary_key=True)
-    run_id = Column(Integer, ForeignKey("wage_forecast_runs.id"), nullable=False)
+    run_id = Column(Integer, ForeignKey("wage_forecast_runs.id"), index=True, nullable=False)
     date = Column(Date, nullable=False)
     category = Column(String(16), nullable=False)
     predicted_index = Column(Float, nullable=False)
@@ -90,8 +164,9 @@ class BCIForecastRun(Base):
     created_at = Column(DateTime)
     months_predict = Column(Integer, nullable=False)
     notes = Column(String(200))
+    input_hash = Column(String(64), index=True)  # sha256 of the normalized input series
 
-class BCIForecastPoint(Base):
+class BCIForecastPoint(PredictionBands, Base):
     __tablename__ = "bci_forecast_points"
     id = Column(Integer, primary_key=True)
     run_id = Column(Integer, ForeignKey("bci_forecast_runs.id", ondelete="CASCADE"), index=True, nullable=False)
@@ -114,11 +189,190 @@ class PPIForecastRun(Base):
     created_at = Column(DateTime)
     months_predict = Column(Integer, nullable=False)
     notes = Column(String(200))
+    input_hash = Column(String(64), index=True)  # sha256 of the normalized input series
 
-class PPIForecastPoint(Base):
+class PPIForecastPoint(PredictionBands, Base):
     __tablename__ = "ppi_forecast_points"
     id = Column(Integer, primary_key=True)
     run_id = Column(Integer, ForeignKey("ppi_forecast_runs.id", ondelete="CASCADE"), index=True, nullable=False)
     date = Column(Date, index=True, nullable=False)
     category = Column(String(32), index=True, nullable=False, default="PPI")
     predicted_index = Column(Float, nullable=False)
+
+# --- Forecast accuracy ---
+class ForecastError(Base):
+    """One stored forecast point joined to its realized actual."""
+    __tablename__ = "forecast_errors"
+    id = Column(Integer, primary_key=True)
+    family = Column(String(16), nullable=False)      # cpi, cpi_sub, wages, bci, ppi
+    point_id = Column(Integer, nullable=False)       # id in that family's *_forecast_points
+    run_id = Column(Integer, nullable=False)
+    category = Column(String(32), nullable=False)    # CPI, ISNR code, wage/BCI/PPI category
+    model = Column(String(64), nullable=False)
+    anchor = Column(Date, nullable=False)            # last actual month the run was built on
+    date = Column(Date, nullable=False)              # forecast month
+    horizon = Column(Integer, nullable=False)        # months after the anchor
+    predicted = Column(Float, nullable=False)
+    actual = Column(Float, nullable=False)
+    error = Column(Float, nullable=False)            # predicted - actual
+    ape = Column(Float)                              # |error| / |actual| in %
+    __table_args__ = (
+        UniqueConstraint("family", "point_id", name="uq_forecast_error_point"),
+        Index("ix_forecast_error_group", "family", "category", "model"),
+    )
+
+class ForecastAccuracy(Base):
+    """MAE/MAPE/bias per (family, category, model) and horizon or anchor month."""
+    __tablename__ = "forecast_accuracy"
+    id = Column(Integer, primary_key=True)
+    family = Column(String(16), nullable=False)
+    category = Column(String(32), nullable=False)
+    model = Column(String(64), nullable=False)
+    by = Column(String(8), nullable=False)           # "horizon" or "anchor"
+    bucket = Column(String(8), nullable=False)       # "1".."12" or "YYYY-MM"
+    n = Column(Integer, nullable=False)
+    mae = Column(Float)
+    mape = Column(Float)
+    bias = Column(Float)
+    __table_args__ = (
+        UniqueConstraint("family", "category", "model", "by", "bucket", name="uq_forecast_accuracy"),
+    )
+
+# --- Data version ---
+class DataVersion(Base):
+    """Single row counting writes that changed stored data (bumped by bulk_upsert)."""
+    __tablename__ = "data_version"
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+def init_db(bind=engine) -> None:
+    """
+    Create missing tables, then bring existing ones up to date: add nullable
+    columns and indexes declared here since the table was created.
+    """
+    Base.metadata.create_all(bind)
+    insp = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            have = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in have:
+                    continue
+                if not col.nullable:
+                    raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{col.name} to existing table")
+                ddl = col.type.compile(dialect=bind.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {ddl}"))
+            for idx in table.indexes:
+                conn.execute(CreateIndex(idx, if_not_exists=True))  # reflection skips expression indexes
+        for name in RETIRED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+# --- Bulk writes ---
+@dataclass
+class UpsertResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def __add__(self, other: "UpsertResult") -> "UpsertResult":
+        return UpsertResult(self.inserted + other.inserted,
+                            self.updated + other.updated,
+                            self.unchanged + other.unchanged)
+
+    def __str__(self) -> str:
+        return f"{self.inserted} inserted, {self.updated} updated, {self.unchanged} unchanged"
+
+_DIALECT_INSERT = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def _dialect_insert(session):
+    """The INSERT construct with ON CONFLICT support for the session's database."""
+    name = session.get_bind().dialect.name
+    insert = _DIALECT_INSERT.get(name)
+    if insert is None:
+        raise NotImplementedError(f"upserts are not supported on {name} (only {', '.join(_DIALECT_INSERT)})")
+    return insert
+
+def _coerce(column, value):
+    """Normalize pandas/numpy scalars to what the column stores (None for NaN/NaT)."""
+    if value is None:
+        return None
+    if hasattr(value, "item") and not isinstance(value, (date, datetime)):
+        value = value.item()  # numpy scalar -> python
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(column.type, Date) and isinstance(value, datetime):
+        if value != value:  # NaT
+            return None
+        return value.date()
+    return value
+
+def _same(a, b) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    if isinstance(a, float) or isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-12, abs_tol=1e-12)
+    return a == b
+
+def bulk_upsert(session, model, rows, keys, batch_size: int = 500) -> UpsertResult:
+    """
+    Write `rows` (DataFrame or iterable of dicts keyed by column name) into `model`
+    with batched INSERT ... ON CONFLICT(keys) DO UPDATE statements.
+
+    `keys` must match a unique constraint on the table. Existing rows for the key
+    range are read in one query so rows identical to what is stored are skipped.
+    """
+    table = model.__table__
+    insert = _dialect_insert(session)
+    records = rows.to_dict("records") if hasattr(rows, "to_dict") else list(rows)
+    if not records:
+        return UpsertResult()
+
+    cols = [c for c in records[0] if c in table.c and c != "id"]
+    values = [c for c in cols if c not in keys]
+
+    # normalize and dedupe by key (last one wins)
+    by_key = {}
+    for r in records:
+        row = {c: _coerce(table.c[c], r.get(c)) for c in cols}
+        by_key[tuple(row[k] for k in keys)] = row
+
+    # current state of the touched key range, one round trip
+    first = table.c[keys[0]]
+    firsts = [k[0] for k in by_key]
+    stmt = select(*[table.c[k] for k in keys], *[table.c[v] for v in values])
+    stmt = stmt.where(first.between(min(firsts), max(firsts)))
+    for k in keys[1:]:
+        distinct = {key[keys.index(k)] for key in by_key}
+        if len(distinct) <= batch_size:
+            stmt = stmt.where(table.c[k].in_(distinct))
+    existing = {tuple(r[:len(keys)]): r[len(keys):] for r in session.execute(stmt)}
+
+    result = UpsertResult()
+    pending = []
+    for key, row in by_key.items():
+        old = existing.get(key)
+        if old is None:
+            result.inserted += 1
+        elif all(_same(a, row[v]) for a, v in zip(old, values)):
+            result.unchanged += 1
+            continue
+        else:
+            result.updated += 1
+        pending.append(row)
+
+    for i in range(0, len(pending), batch_size):
+        ins = insert(table).values(pending[i:i + batch_size])
+        if values:
+            ins = ins.on_conflict_do_update(index_elements=keys, set_={v: ins.excluded[v] for v in values})
+        else:
+            ins = ins.on_conflict_do_nothing(index_elements=keys)
+        session.execute(ins)
+    if pending:
+        bump_data_version(session)
+    return result
+
+def bump_data_version(session) -> None:
+    """Move DataVersion on, so readers caching derived data (app._cached) rebuild it."""
+    table = DataVersion.__table__
+    ins = _dialect_insert(session)(table).values(id=1, value=1)
+    session.execute(ins.on_conflict_do_update(index_elements=["id"], set_={"value": table.c.value + 1}))
@@ -0,0 +1,160 @@
+# cpi_app/pipelines/backtest.py
+"""
+Rolling-origin backtest of the forecast MODELS.
+
+Every model forecasts every series from every historical anchor month in one
+array pass (see forecast.MODELS); errors against the realized values are then
+reduced per (series, model, horizon). Models are compared on the same anchors:
+an anchor only counts where every model produced a forecast.
+
+Large panels can be split by series across a process pool (`workers`).
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .forecast import MODELS, _lag, _with_bands, last_observed, trailing
+
+
+@dataclass
+class Backtest:
+    scores: pd.DataFrame   # series, model, horizon, n, mae, mape, bias
+
+    def summary(self, metric: str = "mape") -> pd.DataFrame:
+        """(series × model) `metric` averaged over horizons."""
+        return self.scores.pivot_table(index="series", columns="model", values=metric, aggfunc="mean")
+
+    def best(self, metric: str = "mape") -> Dict[str, str]:
+        """{series: model with the lowest mean `metric`} for series with any scored anchor."""
+        table = self.summary(metric).dropna(how="all")
+        return table.idxmin(axis=1).to_dict()
+
+
+def _score(Y: np.ndarray, models: Sequence[str], months: int, first_anchor: int,
+           min_history: int) -> Dict[str, np.ndarray]:
+    """
+    Error sums for a (series × T) block: arrays shaped (models × series × months)
+    holding n, sum |e|, sum |e|/actual and sum e over the scored anchors.
+    """
+    actual = np.stack([_lag(Y, -h) for h in range(1, months + 1)], axis=-1)[:, first_anchor:]
+    history = np.cumsum(~np.isnan(Y), axis=1)[:, first_anchor:]
+
+    preds = np.stack([MODELS[m](Y, months)[:, first_anchor:] for m in models])
+    ok = np.isfinite(preds).all(axis=0) & np.isfinite(actual) & (actual != 0)
+    ok &= (history >= min_history)[..., None]
+
+    err = np.where(ok, preds - actual, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ape = np.where(ok, np.abs(err) / np.abs(actual), 0.0)
+    return {
+        "n": np.broadcast_to(ok.sum(axis=1), err.shape[:2] + (months,)),
+        "abs": np.abs(err).sum(axis=2),
+        "ape": ape.sum(axis=2),
+        "err": err.sum(axis=2),
+    }
+
+
+def _score_chunk(args):
+    return _score(*args)
+
+
+def backtest(
+    panel: pd.DataFrame,
+    models: Optional[Sequence[str]] = None,
+    months: int = 12,
+    anchors: Optional[int] = None,
+    min_history: int = 36,
+    workers: Optional[int] = None,
+    chunk: int = 64,
+) -> Backtest:
+    """
+    Score `models` (default: all registered) on a (month × series) panel of levels.
+
+    `anchors` limits the test to the last N anchor months (default: all). An anchor
+    needs `min_history` observations and its realized value h months ahead.
+    With `workers` > 1 the series are scored in chunks of `chunk` on a process pool.
+    """
+    models = list(models or MODELS)
+    unknown = [m for m in models if m not in MODELS]
+    if unknown:
+        raise ValueError(f"Unknown model(s): {', '.join(unknown)}")
+
+    panel = panel.sort_index()
+    Y = panel.to_numpy(dtype=float).T
+    names = panel.columns.to_numpy()
+    T = Y.shape[1]
+    first_anchor = 0 if anchors is None else max(T - months - anchors, 0)
+
+    blocks = [Y[i:i + chunk] for i in range(0, len(Y), chunk)] or [Y]
+    jobs = [(b, models, months, first_anchor, min_history) for b in blocks]
+    if workers and workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts: List[Dict[str, np.ndarray]] = list(pool.map(_score_chunk, jobs))
+    else:
+        parts = [_score_chunk(j) for j in jobs]
+    sums = {k: np.concatenate([p[k] for p in parts], axis=1) for k in parts[0]}
+
+    n = sums["n"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mae = np.where(n > 0, sums["abs"] / n, np.nan)
+        mape = np.where(n > 0, 100.0 * sums["ape"] / n, np.nan)
+        bias = np.where(n > 0, sums["err"] / n, np.nan)
+
+    M, S, H = n.shape
+    scores = pd.DataFrame({
+        "series": np.tile(np.repeat(names, H), M),
+        "model": np.repeat(models, S * H),
+        "horizon": np.tile(np.arange(1, H + 1), M * S),
+        "n": n.ravel(),
+        "mae": mae.ravel(),
+        "mape": mape.ravel(),
+        "bias": bias.ravel(),
+    })
+    return Backtest(scores[scores["n"] > 0].reset_index(drop=True))
+
+
+def best_model_forecast(
+    panel: pd.DataFrame,
+    months: int,
+    anchors: int = 60,
+    fallback: str = "linear_reg_24m",
+    metric: str = "mape",
+    workers: Optional[int] = None,
+    intervals: bool = False,
+) -> pd.DataFrame:
+    """
+    Backtest every model on the last `anchors` months of a (month-start DatetimeIndex
+    × code) panel, then forecast each code with its best model (`fallback` where
+    there is too little history to score). Codes not observed in the panel's last
+    month (discontinued series) are left out. Returns tidy ['code', 'date', 'value',
+    'model'], plus lo80/hi80/lo95/hi95 columns with `intervals`.
+    """
+    panel = panel.sort_index()
+    panel = panel.loc[:, panel.iloc[-1].notna()] if not panel.empty else panel
+    if panel.empty or panel.columns.empty:
+        return pd.DataFrame(columns=["code", "date", "value", "model"])
+    best = backtest(panel, months=months, anchors=anchors, workers=workers).best(metric)
+    chosen = np.array([best.get(c, fallback) for c in panel.columns])
+
+    Y = panel.to_numpy(dtype=float).T
+    last = last_observed(Y)
+    preds = np.full((len(Y), months), np.nan)
+    for model in np.unique(chosen):
+        rows = np.flatnonzero(chosen == model)
+        preds[rows] = MODELS[model](Y[rows], months)[np.arange(len(rows)), last[rows]]
+
+    last_month = panel.index.to_numpy(dtype="datetime64[M]")[last]
+    out = pd.DataFrame({
+        "code": np.repeat(panel.columns.to_numpy(), months),
+        "date": pd.to_datetime((last_month[:, None] + np.arange(1, months + 1)).ravel()),
+        "value": preds.ravel(),
+        "model": np.repeat(chosen, months),
+    })
+    if intervals:
+        out = _with_bands(out, trailing(Y, last, 24), preds)
+    return out.dropna(subset=["value"]).reset_index(drop=True)
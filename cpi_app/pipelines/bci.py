@@ -1,9 +1,8 @@
 from datetime import datetime
-import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
 
 from cpi_app.scripts.Hagstofan.api_client import APIClient
+from cpi_app.pipelines.forecast import forecast_series
 from cpi_app.scripts.Hagstofan.economy.construction_price_index import ConstructionPriceIndex
 
 DATE_FMT = "%YM%m"  # e.g. 2025M07
@@ -25,14 +24,7 @@ def fetch_bci_series(categories=None) -> pd.DataFrame:
 
 def compute_forecast(series: pd.Series, months: int = 6, window: int = 24):
     """series: pd.Series indexed by datetime.date ascending, values are index levels"""
-    s = series.dropna()
-    if len(s) < 2:
+    # plain (unanchored) trend over the last `window` points
+    if len(series.dropna()) < 2:
         return []
-    y = s.values[-window:] if len(s) > window else s.values
-    X = np.arange(len(y)).reshape(-1, 1)
-    model = LinearRegression().fit(X, y)
-    future_X = np.arange(len(y), len(y) + months).reshape(-1, 1)
-    preds = model.predict(future_X)
-    last_date = s.index[-1]
-    future_dates = pd.date_range(last_date, periods=months+1, freq="MS")[1:]  # next months
-    return list(zip([d.date() for d in future_dates], preds))
+    return [(d.date(), yhat) for d, yhat in forecast_series(series, months, window=window, anchored=False)]
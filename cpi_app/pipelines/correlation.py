@@ -0,0 +1,123 @@
+# cpi_app/pipelines/correlation.py
+"""
+Correlations between index series on a common month axis (CPI and its main
+groups, wages, PPI, BCI categories), computed on their % changes:
+
+  - lagged_correlations: corr(x_i(t), x_j(t + k)) for every pair and every lag
+    k in -max_lag..max_lag at once; k > 0 means series i leads series j by k months
+  - rolling_correlations: corr over a trailing window, for every month and pair
+
+Both use pairwise-complete observations: a series contributes to a pair only in
+months where both are observed. Sums, cross-products and counts over those
+months are matrix products with the observed masks, so nothing loops over pairs
+or months.
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+TRANSFORMS = {"mom": 1, "yoy": 12}   # % change over this many months
+MIN_OBS = 24                         # fewer common months than this gives NaN
+
+
+def aligned_panel(series: Dict[str, pd.Series]) -> pd.DataFrame:
+    """{name: level series on month starts} -> (dense month grid × name) frame."""
+    frame = pd.DataFrame({k: v for k, v in series.items() if not v.empty})
+    if frame.empty:
+        return frame
+    frame.index = pd.to_datetime(frame.index).to_period("M").to_timestamp()
+    frame = frame.groupby(level=0).last()
+    return frame.reindex(pd.date_range(frame.index.min(), frame.index.max(), freq="MS"))
+
+
+def changes(panel: pd.DataFrame, transform: str = "mom") -> pd.DataFrame:
+    """% change of every column over TRANSFORMS[transform] months (NaN across gaps)."""
+    k = TRANSFORMS[transform]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = (panel / panel.shift(k) - 1.0) * 100.0
+    return out.replace([np.inf, -np.inf], np.nan)
+
+
+def _centred(X: np.ndarray) -> np.ndarray:
+    """Columns minus their mean over observed rows (keeps the moment sums well conditioned)."""
+    seen = np.isfinite(X)
+    mean = np.where(seen, X, 0.0).sum(axis=0) / np.maximum(seen.sum(axis=0), 1)
+    return X - mean
+
+
+def _pairwise(A: np.ndarray, B: np.ndarray, min_obs: int) -> np.ndarray:
+    """
+    corr(A[:, i], B[:, j]) over rows where both are finite, for stacked
+    (... × T × n) inputs; returns (... × n × n).
+    """
+    Ma, Mb = np.isfinite(A).astype(float), np.isfinite(B).astype(float)
+    A0, B0 = np.where(Ma > 0, A, 0.0), np.where(Mb > 0, B, 0.0)
+    t = lambda X: np.swapaxes(X, -1, -2)
+    n = t(Ma) @ Mb
+    sa, sb = t(A0) @ Mb, t(Ma) @ B0
+    saa, sbb = t(A0 * A0) @ Mb, t(Ma) @ (B0 * B0)
+    sab = t(A0) @ B0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = n * sab - sa * sb
+        var = (n * saa - sa * sa) * (n * sbb - sb * sb)
+        r = cov / np.sqrt(var)
+    return np.where((n >= min_obs) & (var > 0), np.clip(r, -1.0, 1.0), np.nan)
+
+
+def lagged_correlations(X: np.ndarray, max_lag: int = 12, min_obs: int = MIN_OBS) -> np.ndarray:
+    """
+    (2·max_lag + 1 × n × n) array C with C[max_lag + k, i, j] = corr(X[t, i], X[t + k, j])
+    for a (T × n) matrix of changes, all lags in one batched product.
+    """
+    T = X.shape[0]
+    X = _centred(X)
+    lags = np.arange(-max_lag, max_lag + 1)
+    idx = np.arange(T)[None, :] + lags[:, None]                 # row t + k, per lag
+    ok = (idx >= 0) & (idx < T)
+    B = np.where(ok[:, :, None], X[np.clip(idx, 0, T - 1)], np.nan)
+    A = np.broadcast_to(X, B.shape)
+    return _pairwise(A, B, min_obs)
+
+
+def rolling_correlations(X: np.ndarray, window: int = 36, min_obs: int = MIN_OBS,
+                         Y: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    (T × n × m) correlations of X's n columns with Y's m columns (Y defaults to X)
+    over the trailing `window` months ending at each row, from running sums of the
+    masked cross-products (one cumsum per moment). min_obs above `window` is
+    capped at `window`.
+    """
+    min_obs = min(min_obs, window)
+    X = _centred(X)
+    Y = X if Y is None else _centred(Y)
+    Mx, My = np.isfinite(X).astype(float), np.isfinite(Y).astype(float)
+    X0, Y0 = np.where(Mx > 0, X, 0.0), np.where(My > 0, Y, 0.0)
+    moments = {
+        "n": Mx[:, :, None] * My[:, None, :],
+        "sa": X0[:, :, None] * My[:, None, :],
+        "sb": Mx[:, :, None] * Y0[:, None, :],
+        "saa": (X0 * X0)[:, :, None] * My[:, None, :],
+        "sbb": Mx[:, :, None] * (Y0 * Y0)[:, None, :],
+        "sab": X0[:, :, None] * Y0[:, None, :],
+    }
+    for k, m in moments.items():
+        c = np.cumsum(m, axis=0)
+        c[window:] -= c[:-window].copy()
+        moments[k] = c
+    n_, sa, sb = moments["n"], moments["sa"], moments["sb"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = n_ * moments["sab"] - sa * sb
+        var = (n_ * moments["saa"] - sa * sa) * (n_ * moments["sbb"] - sb * sb)
+        r = cov / np.sqrt(var)
+    return np.where((n_ >= min_obs) & (var > 1e-12), np.clip(r, -1.0, 1.0), np.nan)
+
+
+def lead_lag(C: np.ndarray, max_lag: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(lag, corr) of the strongest |correlation| per pair from lagged_correlations()."""
+    filled = np.where(np.isfinite(C), np.abs(C), -1.0)
+    best = filled.argmax(axis=0)
+    corr = np.take_along_axis(C, best[None], axis=0)[0]
+    return np.where(np.isfinite(corr), best - max_lag, 0), corr
@@ -6,8 +6,6 @@ from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
-from dateutil.relativedelta import relativedelta
-from sklearn.linear_model import LinearRegression
 from datetime import datetime
 import re
 
@@ -15,14 +13,34 @@ import re
 from cpi_app.scripts.Hagstofan.api_client import APIClient
 from cpi_app.scripts.Hagstofan.economy.cpi import CPI as _CPI
 from cpi_app.scripts.Hagstofan.economy.isnr_labels import ISNRLabels
+from cpi_app.pipelines.forecast import LinearFit, fit_linear, future_months
+from cpi_app.pipelines.isnr import ISNRTree, rollup
 
 # ---------- Public API (keeps old function names) ----------
 
 class CPIAdapter:
-    def __init__(self, index: dict, weights: dict | None = None):
+    def __init__(
+        self,
+        index: dict,
+        weights: dict | None = None,
+        panel: pd.DataFrame | None = None,
+        link_factors: Dict[str, float] | None = None,
+        link_months: Dict[str, str] | None = None,
+    ):
         self.index = index
         self.weights = weights or {}
         self.isnr_values = {code for (_ym, code) in index.keys()}
+        # (month × code) levels, months as 'YYYYMmm' strings; built lazily if not given
+        self._panel = panel
+        # code -> new/old scale applied to the old base, and the month it was linked at
+        self.link_factors = link_factors or {}
+        self.link_months = link_months or {}
+
+    @property
+    def panel(self) -> pd.DataFrame:
+        if self._panel is None:
+            self._panel = _index_panel(self.index)
+        return self._panel
 
     def list_is_nr_values(self) -> list[str]:
         return sorted(self.isnr_values)
@@ -37,45 +55,102 @@ def _select_total_code(codes: set[str]) -> str | None:
     return next((c for c in sorted(codes) if re.match(r"^(IS|CP)00$", c)), None)
 
 
-def _merge_cpi_sources(new_src: _CPI, old_src: _CPI) -> CPIAdapter:
-    new_index = dict(new_src.index)
-    old_index = old_src.index
+def _index_panel(index: dict) -> pd.DataFrame:
+    """Pivot a {(YYYYMmm, code): value} store into a (month × code) frame."""
+    if not index:
+        return pd.DataFrame(dtype=float)
+    return pd.Series(index, dtype=float).unstack().sort_index()
 
-    new_codes = {code for (_ym, code) in new_index.keys()}
-    old_codes = {code for (_ym, code) in old_index.keys()}
-    new_total = _select_total_code(new_codes)
-    old_total = _select_total_code(old_codes)
 
-    if not new_total or not old_total:
-        return CPIAdapter(new_index, weights=new_src.weights)
+def _panel_index(panel: pd.DataFrame) -> dict:
+    """Inverse of _index_panel: {(YYYYMmm, code): value}, skipping gaps."""
+    if panel.empty:
+        return {}
+    return panel.stack(future_stack=True).dropna().to_dict()
+
+
+@dataclass
+class ChainLink:
+    panel: pd.DataFrame              # spliced (month × code) levels on the new base
+    factors: Dict[str, float]        # code -> scale applied to the old series
+    months: Dict[str, str]           # code -> YYYYMmm the link was made at
+
+
+def chain_link(
+    new: pd.DataFrame,
+    old: pd.DataFrame,
+    adjacent: Iterable[str] = (),
+) -> ChainLink:
+    """
+    Splice `old` onto the base of `new` for every code present in both panels.
+
+    Each shared code is rescaled at its latest month observed in both tables and the
+    rescaled old values fill the months before the code's first new observation.
+    Codes listed in `adjacent` that have no overlap are linked old-last to new-first
+    instead (the historical behaviour for the headline series).
+    """
+    months = new.index.union(old.index)
+    panel = new.reindex(index=months)
+    shared = new.columns.intersection(old.columns)
+    if shared.empty:
+        return ChainLink(panel, {}, {})
+
+    N = panel[shared].to_numpy(dtype=float, copy=True)
+    O = old[shared].reindex(index=months).to_numpy(dtype=float)
+    rows = np.arange(len(months))
+    cols = np.arange(len(shared))
+
+    has_new = ~np.isnan(N)
+    has_old = ~np.isnan(O) & (O != 0)
+    both = has_new & has_old
+
+    # latest overlap month per code
+    overlap = both.any(axis=0)
+    link_row = len(months) - 1 - np.argmax(both[::-1], axis=0)
+
+    # codes allowed to link across a gap: last old month -> first new month
+    gap = np.isin(shared, list(adjacent)) & ~overlap & has_new.any(axis=0) & has_old.any(axis=0)
+    first_new = np.argmax(has_new, axis=0)
+    last_old = len(months) - 1 - np.argmax(has_old[::-1], axis=0)
+
+    linked = overlap | gap
+    num_row = np.where(overlap, link_row, first_new)
+    den_row = np.where(overlap, link_row, last_old)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factors = np.where(linked, N[num_row, cols] / O[den_row, cols], np.nan)
+
+    fill = linked & (rows[:, None] < first_new)
+    N[fill] = (O * factors)[fill]
+    panel[shared] = N
+    panel = panel.dropna(how="all")
 
-    new_series = {ym: val for (ym, code), val in new_index.items() if code == new_total}
-    old_series = {ym: val for (ym, code), val in old_index.items() if code == old_total}
-    overlap = sorted(set(new_series.keys()).intersection(old_series.keys()))
-    anchor = None
-    old_anchor = None
-    new_anchor = None
+    codes = shared[linked]
+    return ChainLink(
+        panel=panel,
+        factors=dict(zip(codes, factors[linked].tolist())),
+        months=dict(zip(codes, months[den_row[linked]])),
+    )
 
-    if overlap:
-        anchor = overlap[-1]
-        old_anchor = old_series.get(anchor)
-        new_anchor = new_series.get(anchor)
-    else:
-        if old_series and new_series:
-            old_anchor = old_series.get(max(old_series.keys()))
-            new_anchor = new_series.get(min(new_series.keys()))
 
-    if old_anchor in (None, 0) or new_anchor is None:
-        return CPIAdapter(new_index, weights=new_src.weights)
+def _merge_cpi_sources(new_src: _CPI, old_src: _CPI) -> CPIAdapter:
+    new_codes = {code for (_ym, code) in new_src.index.keys()}
+    old_codes = {code for (_ym, code) in old_src.index.keys()}
+    new_total = _select_total_code(new_codes)
+    old_total = _select_total_code(old_codes)
 
-    scale = new_anchor / old_anchor
-    new_start = min(new_series.keys()) if new_series else None
-    for ym, val in old_series.items():
-        if new_start and ym >= new_start:
-            continue
-        new_index[(ym, new_total)] = float(val) * scale
+    new_panel = _index_panel(new_src.index)
+    old_panel = _index_panel(old_src.index)
+    if new_total and old_total and old_total != new_total:
+        old_panel = old_panel.drop(columns=[new_total], errors="ignore").rename(columns={old_total: new_total})
 
-    return CPIAdapter(new_index, weights=new_src.weights)
+    link = chain_link(new_panel, old_panel, adjacent=[new_total] if new_total else [])
+    return CPIAdapter(
+        _panel_index(link.panel),
+        weights=new_src.weights,
+        panel=link.panel,
+        link_factors=link.factors,
+        link_months=link.months,
+    )
 
 
 def fetch_cpi_data() -> CPIAdapter:
@@ -84,6 +159,8 @@ def fetch_cpi_data() -> CPIAdapter:
     Returns a CPI data-source object backed by your Hagstofan module, already loaded with:
       - overall CPI and all ISNR sub-categories (B1997 index)
       - weights (from VIS01305)
+      - every code shared with the older VIS01102 table chain-linked onto the new base
+        (see `panel`, `link_factors` and `link_months` on the returned adapter)
     """
     client = APIClient(base_url="https://px.hagstofa.is:443/pxis/api/v1")
     new_src = _CPI(
@@ -135,29 +212,18 @@ def parse_data(source: "_CPI") -> pd.DataFrame:
     return df
 
 
-def compute_trend(df: pd.DataFrame, months_predict: int = 6) -> Tuple[LinearRegression, List[Tuple[datetime, float]]]:
+def compute_trend(df: pd.DataFrame, months_predict: int = 6) -> Tuple[Optional[LinearFit], List[Tuple[datetime, float]]]:
     """
-    Linear trend on CPI level with ANCHOR to last observed value (no visual jump).
-    Returns (model, [(future_date, predicted_cpi), ...]).
+    Linear trend on CPI level over all rows of df, with ANCHOR to last observed value (no visual jump).
+    Returns (fit, [(future_date, predicted_cpi), ...]).
     """
     if df.empty:
-        return LinearRegression(), []
-
-    X = np.arange(len(df)).reshape(-1, 1)
-    y = df["CPI"].astype(float).values
-    model = LinearRegression()
-    model.fit(X, y)
-
-    # bias-correct to anchor at last actual
-    last_hat = model.predict([[len(df) - 1]])[0]
-    bias = y[-1] - last_hat
-
-    future_X = np.arange(len(df), len(df) + months_predict).reshape(-1, 1)
-    preds = model.predict(future_X) + bias
+        return None, []
 
-    last_date = pd.to_datetime(df["date"].iloc[-1])
-    future_dates = [last_date + relativedelta(months=i) for i in range(1, months_predict + 1)]
-    return model, list(zip([d.to_pydatetime() for d in future_dates], preds.tolist()))
+    fit = fit_linear(df["CPI"].astype(float).values)
+    preds = fit.forecast(months_predict, anchored=True)[0]
+    future_dates = future_months(df["date"].iloc[-1], months_predict)
+    return fit, list(zip([d.to_pydatetime() for d in future_dates], preds.tolist()))
 
 
 def compute_annual_cpi(df: pd.DataFrame, end_index: int) -> Optional[float]:
@@ -209,6 +275,15 @@ def get_isnr_series(source: "_CPI", isnr: str) -> pd.DataFrame:
     return df
 
 
+def isnr_panel(source: "_CPI") -> pd.DataFrame:
+    """(month-start DatetimeIndex × ISNR code) levels for every code in the source."""
+    panel = source.panel if hasattr(source, "panel") else _index_panel(source.index)
+    dates = pd.to_datetime(panel.index, format="%YM%m", errors="coerce")
+    out = panel.loc[~dates.isna()].copy()
+    out.index = dates[~dates.isna()]
+    return out.sort_index()
+
+
 def latest_weights(source: "_CPI") -> Dict[str, float]:
     """
     Returns a dict {ISNR: weight} for the latest month where weights exist.
@@ -229,6 +304,279 @@ def latest_weights(source: "_CPI") -> Dict[str, float]:
     return out
 
 
+def top_level_codes(codes: Iterable[str]) -> List[str]:
+    """ISNR main groups (IS01 .. IS12), without the total."""
+    return ISNRTree(codes).top_level()
+
+
+def _shift(X: np.ndarray, k: int) -> np.ndarray:
+    """X moved down k rows (row t holds row t-k), NaN-padded."""
+    out = np.full_like(X, np.nan)
+    out[k:] = X[:-k]
+    return out
+
+
+def _pct_change(X: np.ndarray, k: int) -> np.ndarray:
+    """% change of each row vs k rows earlier (NaN where either side is missing or zero)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = (X / _shift(X, k) - 1.0) * 100.0
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+def weights_panel(source: "_CPI") -> pd.DataFrame:
+    """
+    (month-start DatetimeIndex × code) basket weights as % of the total, for the
+    months the weight source reports (the total is IS00's weight, else the sum of
+    the main groups).
+    """
+    if not source.weights:
+        return pd.DataFrame()
+    W = pd.Series(source.weights, dtype=float).unstack()
+    W.index = pd.to_datetime(W.index, format="%YM%m", errors="coerce")
+    W = W.loc[~W.index.isna()].sort_index()
+    total_code = _select_total_code(set(W.columns))
+    total = W[total_code] if total_code else W[top_level_codes(W.columns)].sum(axis=1, min_count=1)
+    return W.div(total, axis=0) * 100.0
+
+
+SUB_METRIC_COLUMNS = ["value", "mom", "yoy", "delta_mom_vs_total", "delta_yoy_vs_total",
+                      "weight", "contrib_mom", "contrib_yoy", "children_weight", "children_mom"]
+
+
+def _basket_shares(P: np.ndarray, t: np.ndarray, months: pd.DatetimeIndex,
+                   codes: pd.Index, weights: pd.DataFrame | None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (W, share) on the (month × code) grid of P: W is the weight in force each
+    month (% of the basket, latest published by then) and share the fraction of
+    headline at t-1 prices, i.e. W price-updated from the weights' own month to t-1.
+    Both are NaN without weights.
+    """
+    W = np.full_like(P, np.nan)
+    if weights is None or weights.empty:
+        return W, W.copy()
+    W = (weights.reindex(columns=codes)
+         .reindex(months.union(weights.index)).ffill().reindex(months)
+         .to_numpy(dtype=float))
+    # row of the weights' own month (their price reference) for every month t
+    published = np.searchsorted(weights.index.values, months.values, side="right") - 1
+    base = np.where(published >= 0, months.get_indexer(weights.index[np.clip(published, 0, None)]), -1)
+    ok = base >= 0
+    Pb = np.where(ok[:, None], P[np.clip(base, 0, None)], np.nan)
+    tb = np.where(ok[:, None], t[np.clip(base, 0, None)], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return W, W / 100.0 * (_shift(P, 1) / Pb) / (_shift(t, 1) / tb)
+
+
+def sub_metrics(panel: pd.DataFrame, total: pd.Series, weights: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Value, MoM/YoY % and their gaps to the total for every (month, code) of a
+    (month-start DatetimeIndex × code) panel, from shifted copies of the whole
+    level matrix. `total` is the headline level series on month starts and
+    `weights` a weights_panel(); each month gets the latest weight published by then.
+
+    contrib_mom is the percentage points a code adds to headline MoM: its change
+    times its weight price-updated from the weights' month to t-1, relative to the
+    headline over the same span. contrib_yoy sums the last twelve contrib_mom, each
+    rescaled from its own month's headline level to the level a year ago, so across
+    the codes of one level both add up to the headline change, weight updates included.
+
+    For codes with sub-codes in the panel, children_weight is the % of the code's
+    weight its children cover and children_mom their weighted MoM, which should
+    match the code's own mom when the hierarchy is complete (see isnr.rollup).
+    Returns tidy ['date', 'code', *SUB_METRIC_COLUMNS] for the observed cells.
+    """
+    if panel.empty:
+        return pd.DataFrame(columns=["date", "code", *SUB_METRIC_COLUMNS])
+    months = pd.date_range(panel.index.min(), panel.index.max(), freq="MS")
+    P = panel.reindex(months).to_numpy(dtype=float)               # months × codes
+    t = total.reindex(months).to_numpy(dtype=float)[:, None]
+    mom, yoy = _pct_change(P, 1), _pct_change(P, 12)
+
+    W, share = _basket_shares(P, t, months, panel.columns, weights)
+    with np.errstate(invalid="ignore"):
+        contrib_mom = share * mom
+        # index points per month, summed over 12-month windows (NaN if any is missing)
+        points = contrib_mom * _shift(t, 1)
+        seen = ~np.isnan(points)
+        csum = np.cumsum(np.where(seen, points, 0.0), axis=0)
+        count = np.cumsum(seen, axis=0).astype(float)
+        window = csum - _shift(csum, 12)
+        contrib_yoy = np.where(count - _shift(count, 12) == 12, window / _shift(t, 12), np.nan)
+
+    tree = ISNRTree(panel.columns)
+    covered, _ = rollup(tree, panel.columns, W, W)
+    _, children_mom = rollup(tree, panel.columns, mom, share)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        children_weight = covered / W * 100.0
+
+    observed = ~np.isnan(P)
+    rows, cols = np.nonzero(observed)
+    return pd.DataFrame({
+        "date": months[rows],
+        "code": panel.columns.to_numpy()[cols],
+        "value": P[observed],
+        "mom": mom[observed],
+        "yoy": yoy[observed],
+        "delta_mom_vs_total": (mom - _pct_change(t, 1))[observed],
+        "delta_yoy_vs_total": (yoy - _pct_change(t, 12))[observed],
+        "weight": W[observed],
+        "contrib_mom": contrib_mom[observed],
+        "contrib_yoy": contrib_yoy[observed],
+        "children_weight": children_weight[observed],
+        "children_mom": children_mom[observed],
+    })
+
+
+CORE_TRIM = 0.15   # weight trimmed from each tail of the monthly change distribution
+CORE_EXCLUSIONS = {
+    # food, electricity, hot water/heating, fuel for vehicles
+    "ex_food_energy": ("IS011", "IS0451", "IS0455", "IS0722"),
+}
+CORE_MEASURES = ["trimmed_mean", "weighted_median", *CORE_EXCLUSIONS]
+
+
+def _chain(mom: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(level chained from 100, YoY %) of a monthly % change series; YoY needs 12 observed months."""
+    seen = np.isfinite(mom)
+    logs = np.cumsum(np.where(seen, np.log1p(mom / 100.0), 0.0))
+    count = np.cumsum(seen).astype(float)
+    level = np.where(seen, 100.0 * np.exp(logs), np.nan)
+    full = count - _shift(count, 12) == 12
+    yoy = np.where(full, np.expm1(logs - _shift(logs, 12)) * 100.0, np.nan)
+    return level, yoy
+
+
+def core_inflation(panel: pd.DataFrame, total: pd.Series, weights: pd.DataFrame,
+                   trim: float = CORE_TRIM,
+                   exclusions: Dict[str, Sequence[str]] = CORE_EXCLUSIONS) -> pd.DataFrame:
+    """
+    Core inflation measures for every month, from the MoM changes of the leaf
+    codes and their basket shares (see _basket_shares):
+
+      - trimmed_mean: weighted mean after dropping `trim` of the weight from each tail
+      - weighted_median: the change at the 50% point of the cumulative weight
+      - one exclusion core per `exclusions` entry: the weighted mean of the leaves
+        outside those codes
+
+    Each month's changes are sorted once (argsort along the code axis) and the
+    trims read off the cumulative weights, so every month is done at once.
+    Monthly cores are chained into an index (100 before the first change) and YoY.
+    Returns tidy ['date', 'measure', 'index_value', 'mom', 'yoy'].
+    """
+    columns = ["date", "measure", "index_value", "mom", "yoy"]
+    tree = ISNRTree(panel.columns)
+    leaves = [c for c in tree.leaves() if c in weights.columns]
+    if not leaves:
+        return pd.DataFrame(columns=columns)
+    months = pd.date_range(panel.index.min(), panel.index.max(), freq="MS")
+    P = panel[leaves].reindex(months).to_numpy(dtype=float)
+    t = total.reindex(months).to_numpy(dtype=float)[:, None]
+    mom = _pct_change(P, 1)
+    _W, share = _basket_shares(P, t, months, pd.Index(leaves), weights)
+    ok = np.isfinite(mom) & np.isfinite(share) & (share > 0)
+    w = np.where(ok, share, 0.0)
+    x = np.where(ok, mom, 0.0)
+    mass = w.sum(axis=1)
+
+    cores: Dict[str, np.ndarray] = {}
+    order = np.argsort(np.where(ok, mom, np.inf), axis=1, kind="stable")
+    xs = np.take_along_axis(x, order, axis=1)
+    ws = np.take_along_axis(w, order, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ws /= mass[:, None]
+        upper = np.cumsum(ws, axis=1)
+        lower = upper - ws
+        kept = np.clip(np.minimum(upper, 1.0 - trim) - np.maximum(lower, trim), 0.0, None)
+        cores["trimmed_mean"] = (kept * xs).sum(axis=1) / kept.sum(axis=1)
+        mid = np.argmax(upper >= 0.5, axis=1)
+        cores["weighted_median"] = xs[np.arange(len(xs)), mid]
+
+        for name, excluded in exclusions.items():
+            keep = ~np.isin(leaves, tree.subtree(excluded))
+            cores[name] = (w[:, keep] * x[:, keep]).sum(axis=1) / w[:, keep].sum(axis=1)
+
+    frames = []
+    for name, core in cores.items():
+        core = np.where(mass > 0, core, np.nan)
+        level, yoy = _chain(core)
+        frames.append(pd.DataFrame({"date": months, "measure": name,
+                                    "index_value": level, "mom": core, "yoy": yoy}))
+    out = pd.concat(frames, ignore_index=True)
+    return out.loc[out["mom"].notna(), columns].reset_index(drop=True)
+
+
+def leaf_codes(codes: Iterable[str]) -> List[str]:
+    """ISNR codes with no finer code below them (IS0111 is a leaf, IS011 is not)."""
+    return ISNRTree(codes).leaves()
+
+
+def price_updated_weights(panel: pd.DataFrame, weights: pd.DataFrame, month: pd.Timestamp) -> Dict[str, float]:
+    """
+    {code: basket weight at `month` prices}: the weights in force then (latest
+    published, from weights_panel()) times each code's price change since the
+    weights' own month, w_i · P_i,month / P_i,b, normalised to sum to 100 over
+    the codes of one level. Codes without a level in both months are left out.
+    """
+    published = weights.index[weights.index <= month]
+    if published.empty:
+        return {}
+    b = published[-1]
+    levels = panel.ffill()
+    if b not in levels.index or month not in levels.index:
+        return {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = weights.loc[b] * (levels.loc[month] / levels.loc[b]).reindex(weights.columns)
+    w = w[np.isfinite(w) & (w > 0)]
+    tree = ISNRTree(w.index)
+    top = [c for c in tree.top_level() if c in w.index]
+    scale = 100.0 / w[top].sum() if top and w[top].sum() > 0 else 1.0
+    return (w * scale).to_dict()
+
+
+def bottom_up_forecast(
+    panel: pd.DataFrame,
+    weights: pd.DataFrame,
+    leaf_forecast: pd.DataFrame,
+    total_code: str | None = None,
+    shocks: Dict[str, float] | None = None,
+) -> pd.DataFrame:
+    """
+    Headline CPI path implied by leaf sub-index forecasts.
+
+    `panel` is isnr_panel(source), `weights` a weights_panel() and `leaf_forecast`
+    a tidy ['code', 'date', 'value', ...] frame of projected levels. Each leaf's
+    projection is turned into relatives to the last actual month T; the headline
+    then moves with the weights at T prices (price_updated_weights) times the
+    (months × leaves) relatives matrix,
+    one product per horizon month. `shocks` adds {code: %} on top of a leaf's path
+    for what-if scenarios. Leaves without a projection for a month drop out of that
+    month's weights. Returns ['date', 'value'] for the months after the headline's last actual.
+    """
+    total_code = total_code or _select_total_code(set(panel.columns))
+    total = panel[total_code].dropna() if total_code in panel else pd.Series(dtype=float)
+    if total.empty or weights is None or weights.empty:
+        return pd.DataFrame(columns=["date", "value"])
+    weights = price_updated_weights(panel, weights, total.index[-1])
+    leaves = [c for c in leaf_codes(panel.columns) if weights.get(c, 0) > 0]
+    fut = leaf_forecast[leaf_forecast["code"].isin(leaves)]
+    if total.empty or fut.empty:
+        return pd.DataFrame(columns=["date", "value"])
+
+    levels = fut.pivot_table(index="date", columns="code", values="value").sort_index()
+    levels = levels[levels.index > total.index[-1]]
+    last = panel[levels.columns].ffill().loc[total.index[-1]]
+    R = (levels / last).to_numpy(dtype=float)                     # months × leaves
+    if shocks:
+        R = R * np.array([1.0 + shocks.get(c, 0.0) / 100.0 for c in levels.columns])
+
+    w = np.array([weights[c] for c in levels.columns], dtype=float)
+    has = ~np.isnan(R)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel = np.where(has, R, 0.0) @ w / (has @ w)
+    return pd.DataFrame({"date": levels.index, "value": float(total.iloc[-1]) * rel})
+
+
 def contribution_table(source: "_CPI", months_back: int = 1, top_k: Optional[int] = 10) -> pd.DataFrame:
     """
     (Nice for the UI) Build a table of latest sub-category contributions.
@@ -273,3 +621,52 @@ def contribution_table(source: "_CPI", months_back: int = 1, top_k: Optional[int
     if top_k:
         df = df.head(top_k)
     return df.reset_index(drop=True)
+
+
+class MonthlyLevels:
+    """
+    Index levels of one or more codes on a dense month grid, for O(1) lookups:
+    values[row, j] is the level in month `first` + j (months since 1970-01),
+    NaN where the code has no observation.
+    """
+
+    def __init__(self, codes: Sequence[str], first: int, values: np.ndarray):
+        self.codes = list(codes)
+        self.first = first
+        self.values = values
+        self._rows = {c: i for i, c in enumerate(self.codes)}
+
+    @classmethod
+    def from_panel(cls, panel: pd.DataFrame) -> "MonthlyLevels":
+        """From a (month-start DatetimeIndex × code) panel such as isnr_panel()."""
+        panel = panel.dropna(how="all")
+        months = panel.index.to_numpy(dtype="datetime64[M]").astype(np.int64)
+        if not len(months):
+            return cls(list(panel.columns), 0, np.empty((len(panel.columns), 0)))
+        first = int(months.min())
+        values = np.full((panel.shape[1], int(months.max()) - first + 1), np.nan)
+        values[:, months - first] = panel.to_numpy(dtype=float).T
+        return cls(list(panel.columns), first, values)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._rows
+
+    def span(self, code: str) -> Tuple[np.datetime64, np.datetime64]:
+        """(first, last) month with a level for `code`."""
+        seen = np.flatnonzero(~np.isnan(self.values[self._rows[code]]))
+        if not seen.size:
+            raise LookupError(f"no levels for {code}")
+        return tuple(np.datetime64(int(self.first + i), "M") for i in (seen[0], seen[-1]))
+
+    def at(self, code: str, months) -> np.ndarray:
+        """Levels of `code` for an array of datetime64[M] months (NaN outside the data)."""
+        pos = np.asarray(months, dtype="datetime64[M]").astype(np.int64) - self.first
+        row = self.values[self._rows[code]]
+        ok = (pos >= 0) & (pos < len(row))
+        out = np.full(pos.shape, np.nan)
+        out[ok] = row[pos[ok]]
+        return out
+
+    def ratio(self, code: str, start, end) -> np.ndarray:
+        """Level in `end` over level in `start`, element-wise."""
+        return self.at(code, end) / self.at(code, start)
@@ -0,0 +1,446 @@
+# cpi_app/pipelines/forecast.py
+"""
+Closed-form linear trend fits (pure NumPy), shared by the pipelines and backfills,
+plus a registry of simple forecasting models (MODELS) for backtesting and
+residual-bootstrap prediction intervals (bootstrap_intervals).
+
+Conventions:
+  - one x step per month; a series is fitted on 0..n-1 over its last `window` points
+  - forecasts are dated on the first of each following month
+  - anchored forecasts pass through the last observation (no visual jump),
+    unanchored ones are the plain fitted line
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class LinearFit:
+    """Per-row OLS fit of a (series × window) matrix on x = 0..window-1."""
+    slope: np.ndarray       # per month
+    intercept: np.ndarray   # fitted value at x == 0
+    last: np.ndarray        # last observed value
+    last_x: np.ndarray      # x of the last observation
+    n: np.ndarray           # observations used
+
+    def forecast(self, months: int, anchored: bool = True) -> np.ndarray:
+        """(series × months) predictions for the months after each last observation."""
+        h = np.arange(1, months + 1)
+        if anchored:
+            return self.last[:, None] + self.slope[:, None] * h
+        return self.intercept[:, None] + self.slope[:, None] * (self.last_x[:, None] + h)
+
+
+def fit_linear(Y) -> LinearFit:
+    """
+    Closed-form OLS of every row of Y on its column position. Y may be 1-D (one
+    series) or 2-D (series × window); NaN marks a missing month. Rows with fewer
+    than 2 observations get a flat (zero) slope.
+    """
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    rows, w = Y.shape
+    x = np.arange(w, dtype=float)
+    seen = ~np.isnan(Y)
+    Yz = np.where(seen, Y, 0.0)
+
+    n = seen.sum(axis=1)
+    sx = (seen * x).sum(axis=1)
+    sxx = (seen * x * x).sum(axis=1)
+    sy = Yz.sum(axis=1)
+    sxy = (Yz * x).sum(axis=1)
+
+    denom = n * sxx - sx * sx
+    slope = np.divide(n * sxy - sx * sy, denom, out=np.zeros(rows), where=denom > 0)
+    intercept = np.divide(sy - slope * sx, n, out=np.full(rows, np.nan), where=n > 0)
+    last_x = w - 1 - np.argmax(seen[:, ::-1], axis=1)
+    last = np.where(n > 0, Y[np.arange(rows), last_x], np.nan)
+    return LinearFit(slope=slope, intercept=intercept, last=last, last_x=last_x, n=n)
+
+
+def linear_forecast(Y, months: int, anchored: bool = True) -> np.ndarray:
+    """fit_linear(Y).forecast(months, anchored): (series × months)."""
+    return fit_linear(Y).forecast(months, anchored)
+
+
+def future_months(last, months: int) -> pd.DatetimeIndex:
+    """The `months` month starts following the month of `last`."""
+    start = pd.Timestamp(last).to_period("M").to_timestamp()
+    return pd.date_range(start, periods=months + 1, freq="MS")[1:]
+
+
+def right_aligned(series: Iterable, window: int) -> np.ndarray:
+    """Stack the last `window` values of each series into a NaN-padded (series × window) matrix."""
+    series = list(series)
+    Y = np.full((len(series), window), np.nan)
+    for i, values in enumerate(series):
+        v = np.asarray(values, dtype=float)[-window:]
+        if len(v):
+            Y[i, window - len(v):] = v
+    return Y
+
+
+def forecast_series(series: pd.Series, months: int, window: int = 24,
+                    anchored: bool = True) -> List[Tuple[pd.Timestamp, float]]:
+    """[(month start, prediction), ...] for a date-indexed level series."""
+    s = series.dropna().sort_index()
+    if s.empty:
+        return []
+    preds = linear_forecast(s.to_numpy(dtype=float)[-window:], months, anchored)[0]
+    return list(zip(future_months(s.index[-1], months), preds.tolist()))
+
+
+def forecast_frame(df: pd.DataFrame, months: int, window: int = 24, anchored: bool = True,
+                   min_obs: int = 1, intervals: bool = False) -> pd.DataFrame:
+    """
+    Forecast every category of a tidy ['date', 'category', 'value'] frame in one fit.
+    Returns a tidy ['category', 'date', 'value'] frame of predictions (dates as Timestamps),
+    plus lo80/hi80/lo95/hi95 columns with `intervals`.
+    """
+    cats, values, lasts = [], [], []
+    for cat, sub in df.dropna(subset=["value"]).groupby("category", sort=True):
+        sub = sub.sort_values("date")
+        if len(sub) < min_obs:
+            continue
+        cats.append(cat)
+        values.append(sub["value"].to_numpy(dtype=float))
+        lasts.append(sub["date"].iloc[-1])
+    if not cats:
+        return pd.DataFrame(columns=["category", "date", "value"])
+
+    Y = right_aligned(values, window)
+    preds = linear_forecast(Y, months, anchored)
+    out = pd.DataFrame({
+        "category": np.repeat(cats, months),
+        "date": np.concatenate([future_months(d, months) for d in lasts]),
+        "value": preds.ravel(),
+    })
+    return _with_bands(out, Y, preds) if intervals else out
+
+
+def trailing(P: np.ndarray, last: np.ndarray, window: int) -> np.ndarray:
+    """The `window` columns of each row of P ending at column last[row] (NaN before column 0)."""
+    cols = last[:, None] - (window - 1) + np.arange(window)
+    rows = np.arange(len(P))[:, None]
+    return np.where(cols >= 0, P[rows, np.clip(cols, 0, None)], np.nan)
+
+
+def forecast_panel(panel: pd.DataFrame, months: int, window: int = 24, anchored: bool = True,
+                   min_obs: int = 2, intervals: bool = False) -> pd.DataFrame:
+    """
+    Forecast every column of a (month-start DatetimeIndex × code) panel in one fit.
+
+    Each code contributes the `window` calendar months ending at its own last
+    observation as one row of a (codes × window) matrix; gaps stay NaN. Codes with
+    fewer than `min_obs` observations in that window are left out.
+    Returns a tidy ['code', 'date', 'value'] frame of predictions, plus
+    lo80/hi80/lo95/hi95 columns with `intervals`.
+    """
+    empty = pd.DataFrame(columns=["code", "date", "value"])
+    if panel.empty:
+        return empty
+    panel = panel.sort_index()
+    P = panel.to_numpy(dtype=float).T  # codes × T
+    last = last_observed(P)
+    Y = trailing(P, last, window)
+
+    fit = fit_linear(Y)
+    keep = fit.n >= max(min_obs, 1)
+    if not keep.any():
+        return empty
+    preds = fit.forecast(months, anchored)[keep]
+
+    last_month = panel.index.to_numpy(dtype="datetime64[M]")[last[keep]]
+    dates = last_month[:, None] + np.arange(1, months + 1)
+    out = pd.DataFrame({
+        "code": np.repeat(panel.columns[keep].to_numpy(), months),
+        "date": pd.to_datetime(dates.ravel()),
+        "value": preds.ravel(),
+    })
+    return _with_bands(out, Y[keep], preds) if intervals else out
+
+
+@dataclass
+class RollingFit:
+    """OLS fit of the trailing window ending at every index t."""
+    slope: np.ndarray       # per step of x
+    intercept: np.ndarray   # fitted value at the first x of the window
+    bias: np.ndarray        # y[t] - fitted value at t (anchoring correction)
+    n: np.ndarray           # points in the window
+
+    def anchored(self, y: np.ndarray, months: int) -> np.ndarray:
+        """
+        (... × T × months) forecasts anchored to y[t] for unit x steps (months):
+        fitted trend + bias, which reduces to y[t] + slope * h.
+        """
+        h = np.arange(1, months + 1)
+        return np.asarray(y, dtype=float)[..., None] + self.slope[..., None] * h
+
+
+def _window_sum(v: np.ndarray, window: int) -> np.ndarray:
+    """Sum of the trailing `window` values ending at every index of the last axis."""
+    c = np.concatenate((np.zeros(v.shape[:-1] + (1,)), np.cumsum(v, axis=-1)), axis=-1)
+    end = np.arange(1, v.shape[-1] + 1)
+    return c[..., end] - c[..., np.maximum(end - window, 0)]
+
+
+def _rolling_fit(y: np.ndarray, x: np.ndarray, window: int):
+    """
+    (slope, intercept at x == 0, n) of y on x over the trailing `window` points
+    ending at every index of the last axis. Pairs with a NaN are left out.
+    """
+    seen = ~(np.isnan(y) | np.isnan(x))
+    yz = np.where(seen, y, 0.0)
+    xz = np.where(seen, x, 0.0)
+    n = _window_sum(seen.astype(float), window)
+    sx, sy = _window_sum(xz, window), _window_sum(yz, window)
+    sxx, sxy = _window_sum(xz * xz, window), _window_sum(xz * yz, window)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = n * sxx - sx * sx
+        slope = np.where((n >= 2) & (denom > 0), (n * sxy - sx * sy) / denom, np.nan)
+        a = (sy - slope * sx) / n
+    return slope, a, n
+
+
+def rolling_ols(y, window: int, x: Optional[np.ndarray] = None) -> RollingFit:
+    """
+    Regress y on x over the last `window` points ending at every index, using
+    cumulative sums of x, y, x² and xy, so all T fits cost O(T).
+
+    y is 1-D or (series × T); NaN marks a missing month and is left out of the
+    sums. x defaults to 0..T-1 (one step per month). The first window-1 anchors
+    use the shorter history available; anchors with fewer than 2 points are NaN.
+    """
+    y = np.asarray(y, dtype=float)
+    T = y.shape[-1]
+    x = np.arange(T, dtype=float) if x is None else np.asarray(x, dtype=float)
+    x = x - x[0] if T else x  # keep the sums small
+
+    slope, a, n = _rolling_fit(y, np.broadcast_to(x, y.shape), window)
+    start = np.maximum(np.arange(1, T + 1) - window, 0)
+    intercept = a + slope * x[start]
+    bias = y - (a + slope * x)
+    return RollingFit(slope=slope, intercept=intercept, bias=bias, n=n.astype(int))
+
+
+# ---------- model registry ----------
+# Every model maps a (series × T) matrix of monthly levels (NaN = missing) to a
+# (series × T × months) array: out[s, t, h-1] forecasts Y[s, t+h] from Y[s, :t+1].
+# Anchors without enough history, or with Y[s, t] missing, are NaN.
+
+SEASON = 12
+MODELS: Dict[str, Callable[[np.ndarray, int], np.ndarray]] = {}
+
+
+def _model(name: str):
+    def register(fn):
+        MODELS[name] = fn
+        return fn
+    return register
+
+
+def _lag(Y: np.ndarray, k: int) -> np.ndarray:
+    """Y shifted k months later along the last axis (out[..., t] = Y[..., t-k]), NaN padded."""
+    out = np.full_like(Y, np.nan)
+    if k == 0:
+        out[...] = Y
+    elif k > 0:
+        out[..., k:] = Y[..., :-k]
+    else:
+        out[..., :k] = Y[..., -k:]
+    return out
+
+
+def _seasonal_lag(h: int) -> int:
+    """Lag of the observation one or more whole seasons before month t+h."""
+    return SEASON * -(-h // SEASON) - h
+
+
+def _steps(months: int) -> np.ndarray:
+    return np.arange(1, months + 1, dtype=float)
+
+
+@_model("naive")
+def naive(Y, months):
+    return np.repeat(Y[..., None], months, axis=-1)
+
+
+@_model("seasonal_naive")
+def seasonal_naive(Y, months):
+    return np.stack([_lag(Y, _seasonal_lag(h)) for h in range(1, months + 1)], axis=-1)
+
+
+@_model("seasonal_growth")
+def seasonal_growth(Y, months):
+    """Repeat last year's month-on-month log changes on top of the latest level."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        L = np.log(Y)
+    D = L - _lag(L, 1)
+    steps = np.stack([_lag(D, _seasonal_lag(h)) for h in range(1, months + 1)], axis=-1)
+    return np.exp(L[..., None] + np.cumsum(steps, axis=-1))
+
+
+@_model("drift_24m")
+def drift_24m(Y, months, window: int = 24):
+    slope = (Y - _lag(Y, window - 1)) / (window - 1)
+    return Y[..., None] + slope[..., None] * _steps(months)
+
+
+@_model("linear_reg_24m")
+def linear_reg_24m(Y, months, window: int = 24):
+    fit = rolling_ols(Y, window)
+    return np.where(fit.n[..., None] >= window // 2, fit.anchored(Y, months), np.nan)
+
+
+def _smooth(Y, alpha: float, beta: Optional[float] = None, phi: float = 1.0):
+    """Level (and trend) of exponential smoothing at every month, all series at once."""
+    S, T = Y.shape
+    level, trend = np.full(S, np.nan), np.zeros(S)
+    levels, trends = np.full((S, T), np.nan), np.zeros((S, T))
+    for t in range(T):
+        y = Y[:, t]
+        seen = ~np.isnan(y)
+        start = seen & np.isnan(level)
+        step = seen & ~start
+        if beta is None:
+            new_level = alpha * y + (1 - alpha) * level
+            new_trend = trend
+        else:
+            new_level = alpha * y + (1 - alpha) * (level + phi * trend)
+            new_trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        level = np.where(start, y, np.where(step, new_level, level))
+        trend = np.where(step, new_trend, trend)
+        levels[:, t] = np.where(seen, level, np.nan)
+        trends[:, t] = trend
+    return levels, trends
+
+
+@_model("ses")
+def ses(Y, months, alpha: float = 0.5):
+    levels, _ = _smooth(np.atleast_2d(Y), alpha)
+    return np.repeat(levels.reshape(Y.shape)[..., None], months, axis=-1)
+
+
+@_model("holt_damped")
+def holt_damped(Y, months, alpha: float = 0.5, beta: float = 0.1, phi: float = 0.98):
+    """ETS(A,Ad,N) with fixed smoothing parameters."""
+    levels, trends = _smooth(np.atleast_2d(Y), alpha, beta, phi)
+    damp = np.cumsum(phi ** _steps(months))
+    out = levels[..., None] + trends[..., None] * damp
+    return out.reshape(Y.shape + (months,))
+
+
+@_model("ar1_36m")
+def ar1_36m(Y, months, window: int = 36):
+    """AR(1) with intercept on month-on-month log changes, refitted over the trailing window."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        L = np.log(Y)
+    D = L - _lag(L, 1)
+    X = _lag(D, 1)
+    phi, c, n = _rolling_fit(D, X, window)
+    # clipping phi moves the intercept too: c = mean(d) - phi * mean(d_prev) over the window
+    seen = ~(np.isnan(D) | np.isnan(X))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = _window_sum(np.where(seen, X, 0.0), window) / n
+    clipped = np.clip(phi, -0.95, 0.95)
+    c = c + (phi - clipped) * x_mean
+    phi = clipped
+    c = np.where(n >= window // 2, c, np.nan)
+    steps, d = [], D
+    for _ in range(months):
+        d = c + phi * d
+        steps.append(d)
+    return np.exp(L[..., None] + np.cumsum(np.stack(steps, axis=-1), axis=-1))
+
+
+def last_observed(Y: np.ndarray) -> np.ndarray:
+    """Index of the last non-NaN month of every row of a (series × T) matrix."""
+    seen = ~np.isnan(Y)
+    return Y.shape[-1] - 1 - np.argmax(seen[..., ::-1], axis=-1)
+
+
+def model_forecast(Y, model: str, months: int) -> np.ndarray:
+    """(series × months) forecasts of `model` from each row's last observation."""
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    preds = MODELS[model](Y, months)
+    return preds[np.arange(len(Y)), last_observed(Y)]
+
+
+# ---------- prediction intervals ----------
+
+INTERVALS = (80, 95)
+BAND_COLUMNS = tuple(f"{side}{level}" for level in INTERVALS for side in ("lo", "hi"))
+
+
+def _bootstrap_chunk(args) -> np.ndarray:
+    history, point, window, paths, levels, seed = args
+    S, H = point.shape
+    with np.errstate(divide="ignore", invalid="ignore"):
+        L = np.log(history[:, -window:])
+    D = np.diff(L, axis=1)
+    seen = ~np.isnan(D)
+    k = seen.sum(axis=1)
+    # innovations around the point path: the forecast already carries the trend
+    mean = np.divide(np.where(seen, D, 0.0).sum(axis=1), k, out=np.zeros(S), where=k > 0)
+    order = np.argsort(~seen, axis=1, kind="stable")           # observed changes first
+    E = np.take_along_axis(D - mean[:, None], order, axis=1)
+
+    rng = np.random.default_rng(seed)
+    draw = (rng.random((S, paths, H)) * np.maximum(k, 1)[:, None, None]).astype(int)
+    shocks = E[np.arange(S)[:, None, None], draw]               # S × paths × H
+    sims = point[:, None, :] * np.exp(np.cumsum(shocks, axis=2))
+
+    qs = [q for level in levels for q in ((100 - level) / 200, 1 - (100 - level) / 200)]
+    bands = np.quantile(sims, qs, axis=1)                        # len(qs) × S × H
+    bands[:, k < 2] = np.nan
+    return bands
+
+
+def bootstrap_intervals(
+    history,
+    point,
+    window: int = 24,
+    paths: int = 2000,
+    levels: Tuple[int, ...] = INTERVALS,
+    seed: int = 0,
+    workers: Optional[int] = None,
+    chunk: int = 64,
+) -> Dict[str, np.ndarray]:
+    """
+    Residual-bootstrap bands around (series × months) point forecasts.
+
+    The last `window` months of each history row give its month-on-month log
+    changes; demeaned, they are resampled with replacement into `paths` cumulative
+    shock paths per series, all series in one array operation, and the bands are
+    quantiles of point × exp(path). Rows are split into chunks of `chunk`; with
+    `workers` > 1 the chunks run on a process pool. Each chunk has its own seed, so
+    results do not depend on `workers`.
+    Returns {"lo80": ..., "hi80": ..., "lo95": ..., "hi95": ...} of (series × months).
+    """
+    history = np.atleast_2d(np.asarray(history, dtype=float))
+    point = np.atleast_2d(np.asarray(point, dtype=float))
+    jobs = [
+        (history[i:i + chunk], point[i:i + chunk], window, paths, levels, seed + i // chunk)
+        for i in range(0, len(point), chunk)
+    ]
+    if workers and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_bootstrap_chunk, jobs))
+    else:
+        parts = [_bootstrap_chunk(j) for j in jobs]
+    bands = np.concatenate(parts, axis=1) if parts else np.empty((2 * len(levels),) + point.shape)
+    names = [f"{side}{level}" for level in levels for side in ("lo", "hi")]
+    return dict(zip(names, bands))
+
+
+def _with_bands(out: pd.DataFrame, history: np.ndarray, preds: np.ndarray) -> pd.DataFrame:
+    """Add the bootstrap band columns to a tidy forecast frame laid out row-major like preds."""
+    for name, band in bootstrap_intervals(history, preds).items():
+        out[name] = band.ravel()
+    return out
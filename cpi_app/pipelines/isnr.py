@@ -0,0 +1,239 @@
+# cpi_app/pipelines/isnr.py
+"""
+The ISNR code hierarchy (COICOP by prefix: IS01 → IS011 → IS0111 → IS01111).
+
+ISNRTree is built once from a code set. A code's parent is the longest other
+code in the set that prefixes it, so a missing level (IS0111 without IS011) hangs
+off the next one up. The main groups hang off the total (IS00) when it is in the set.
+Codes are kept sorted, so a subtree is one contiguous slice of that order.
+
+rollup() aggregates children into their parent for whole (month × code)
+matrices at once. The result is the weight the children cover and their
+weighted change, to set against what is reported for the parent.
+
+LabelSearch answers typeahead queries over the labels. Codes match by prefix.
+Words match by accent-folded token prefix through a trie, then by trigram
+similarity for typos. LABEL_SEARCH is built once, at import, from ISNRLabels.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from cpi_app.scripts.Hagstofan.economy.isnr_labels import ISNRLabels
+
+CODE = re.compile(r"^(IS|CP)\d+$")
+TOTAL = re.compile(r"^(IS|CP)00$")
+
+
+class ISNRTree:
+    """Parent/children/depth lookups over a set of ISNR codes (other strings are ignored)."""
+
+    def __init__(self, codes: Iterable[str]):
+        codes = sorted(c for c in set(codes) if CODE.match(c))
+        self.total: Optional[str] = next((c for c in codes if TOTAL.match(c)), None)
+        self.codes: List[str] = [c for c in codes if c != self.total]
+        self._parent: Dict[str, Optional[str]] = {}
+        self._children: Dict[Optional[str], List[str]] = {self.total: []}
+        self._depth: Dict[str, int] = {}
+        if self.total:
+            self._depth[self.total] = 0
+
+        # sorted order visits every code right after its ancestors
+        stack: List[str] = []
+        for c in self.codes:
+            while stack and not c.startswith(stack[-1]):
+                stack.pop()
+            parent = stack[-1] if stack else self.total
+            self._parent[c] = parent
+            self._children.setdefault(parent, []).append(c)
+            self._children.setdefault(c, [])
+            self._depth[c] = len(stack) + 1
+            stack.append(c)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._depth
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.codes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def parent(self, code: str) -> Optional[str]:
+        """The code one level up (the total for main groups, None for the total itself)."""
+        return self._parent.get(code)
+
+    def children(self, code: Optional[str]) -> List[str]:
+        """Codes one level down; children(None) or children(total) are the main groups."""
+        if code is None:
+            code = self.total
+        return list(self._children.get(code, []))
+
+    def depth(self, code: str) -> int:
+        """0 for the total, 1 for main groups (IS01 .. IS12), and so on down."""
+        return self._depth[code]
+
+    def ancestors(self, code: str) -> List[str]:
+        """Parent, grandparent, ... up to the total (nearest first)."""
+        out = []
+        p = self.parent(code)
+        while p is not None:
+            out.append(p)
+            p = self.parent(p)
+        return out
+
+    def descendants(self, code: str) -> List[str]:
+        """Every code below `code` (not itself), in sorted order."""
+        if code == self.total:
+            return list(self.codes)
+        i = bisect_right(self.codes, code)
+        return self.codes[i:bisect_left(self.codes, code + "\x7f", i)]
+
+    def subtree(self, codes: Iterable[str]) -> List[str]:
+        """The given codes plus all their descendants, sorted (codes not in the tree are dropped)."""
+        out = set()
+        for c in codes:
+            if c in self:
+                out.add(c)
+                out.update(self.descendants(c))
+        return sorted(out)
+
+    def top_level(self) -> List[str]:
+        """Main groups: codes with nothing above them but the total."""
+        return self.children(None)
+
+    def leaves(self) -> List[str]:
+        """Codes with no children."""
+        return [c for c in self.codes if not self._children[c]]
+
+    def membership(self, columns: Sequence[str]) -> np.ndarray:
+        """(len(columns) × len(columns)) 0/1 matrix, M[i, j] = 1 where columns[j] is the parent of columns[i]."""
+        pos = {c: i for i, c in enumerate(columns)}
+        M = np.zeros((len(columns), len(columns)))
+        for i, c in enumerate(columns):
+            j = pos.get(self.parent(c))
+            if j is not None:
+                M[i, j] = 1.0
+        return M
+
+
+def rollup(tree: ISNRTree, columns: Sequence[str], change: np.ndarray,
+           weight: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Children aggregated into their parent over (month × code) matrices whose
+    columns are `columns`: (children's total weight, their weighted mean change).
+    Missing cells count as absent. Codes without children among `columns` are NaN.
+    """
+    M = tree.membership(columns)
+    ok = np.isfinite(change) & np.isfinite(weight)
+    w = np.where(ok, weight, 0.0)
+    covered = w @ M
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = (w * np.where(ok, change, 0.0)) @ M / covered
+    has_children = M.any(axis=0)
+    covered = np.where(has_children & (covered > 0), covered, np.nan)
+    return covered, np.where(np.isfinite(covered), mean, np.nan)
+
+
+# --- label search ---
+_FOLD = str.maketrans({"ð": "d", "þ": "th", "æ": "ae", "ö": "o"})
+_WORD = re.compile(r"[a-z0-9]+")
+_CODE_QUERY = re.compile(r"^(is|cp)?(\d+)$")
+
+
+def fold(text: str) -> str:
+    """Lower-case ASCII form for matching: 'Húsaleiga' -> 'husaleiga', 'Þjónusta' -> 'thjonusta'."""
+    text = text.lower().translate(_FOLD)
+    return "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of each folded word, padded like pg_trgm ('  bensin ')."""
+    out = set()
+    for w in _WORD.findall(fold(text)):
+        w = f"  {w} "
+        out.update(w[i:i + 3] for i in range(len(w) - 2))
+    return out
+
+
+class LabelSearch:
+    """Prefix trie and trigram postings over {code: label}, for typeahead lookups."""
+
+    def __init__(self, labels: Mapping[str, str], tree: Optional[ISNRTree] = None,
+                 min_similarity: float = 0.5):
+        self.labels = dict(labels)
+        self.tree = tree or ISNRTree(self.labels)
+        self.codes = sorted(self.labels)
+        self.min_similarity = min_similarity
+        self._trie: dict = {}
+        self._grams: Dict[str, Set[str]] = {}
+        for code, label in self.labels.items():
+            for word in _WORD.findall(fold(label)):
+                node = self._trie
+                for ch in word:
+                    node = node.setdefault(ch, {})
+                    node.setdefault("", set()).add(code)   # codes with a word through this node
+            for g in trigrams(label):
+                self._grams.setdefault(g, set()).add(code)
+
+    def _prefixed(self, word: str) -> Set[str]:
+        node = self._trie
+        for ch in word:
+            node = node.get(ch)
+            if node is None:
+                return set()
+        return node.get("", set())
+
+    def _similar(self, query: str) -> Dict[str, float]:
+        """Share of the query's trigrams found in each label (so 'leiga' finds 'húsaleiga')."""
+        grams = trigrams(query)
+        shared = Counter(c for g in grams for c in self._grams.get(g, ()))
+        return {c: n / len(grams) for c, n in shared.items() if n / len(grams) >= self.min_similarity}
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """
+        Best matches for `query`: code prefixes first, then labels whose words start
+        with every query word, then labels by trigram similarity. Shallower codes
+        win ties. Each hit carries its code, label and path from the main group down.
+        """
+        q = fold(query).strip()
+        if not q:
+            return []
+        ranked: Dict[str, Tuple[int, float]] = {}
+
+        m = _CODE_QUERY.match(q.replace(" ", ""))
+        if m:
+            prefix = "IS" + m.group(2)
+            i = bisect_left(self.codes, prefix)
+            for c in self.codes[i:bisect_left(self.codes, prefix + "\x7f", i)]:
+                ranked[c] = (0, 0.0)
+
+        words = _WORD.findall(q)
+        if words:
+            hits = set.intersection(*(self._prefixed(w) for w in words))
+            for c in hits:
+                ranked.setdefault(c, (1, 0.0))
+            if len(ranked) < limit:
+                for c, v in self._similar(q).items():
+                    ranked.setdefault(c, (2, -v))
+
+        depth = lambda c: self.tree.depth(c) if c in self.tree else 99
+        order = sorted(ranked, key=lambda c: (*ranked[c], depth(c), c))[:limit]
+        return [self._hit(c) for c in order]
+
+    def _hit(self, code: str) -> dict:
+        path = list(reversed(self.tree.ancestors(code))) if code in self.tree else []
+        return {
+            "code": code,
+            "label": self.labels[code],
+            "path": [{"code": c, "label": self.labels.get(c, c)} for c in path if c != self.tree.total],
+        }
+
+
+LABEL_SEARCH = LabelSearch(ISNRLabels.LABELS)
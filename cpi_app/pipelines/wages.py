@@ -2,31 +2,51 @@
 from __future__ import annotations
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
-from matplotlib.dates import date2num
 from typing import Iterable, List, Tuple
 
 # Try both import paths (depending on where you keep the module)
 from cpi_app.scripts.Hagstofan.api_client import APIClient
 from cpi_app.scripts.Hagstofan.community.wage_index import WageIndex
+from cpi_app.pipelines.forecast import forecast_series
+
+
+def wage_panel(src: WageIndex, categories: Iterable[str] | None = None) -> pd.DataFrame:
+    """
+    Pivot a loaded WageIndex into a (month × category) DataFrame with a DatetimeIndex.
+    Includes the multi-dimension 'A:B' categories WageIndex synthesizes.
+    If `categories` is given, only those present are kept (in that order).
+    """
+    if not src.index:
+        return pd.DataFrame(dtype=float)
+    panel = pd.Series(src.index, dtype=float).unstack()
+    panel.index = pd.to_datetime(panel.index, format="%YM%m", errors="coerce")
+    panel = panel[panel.index.notna()].sort_index()
+    if categories is not None:
+        panel = panel[[c for c in categories if c in panel.columns]]
+    return panel
+
+
+def fetch_wage_panel(categories: Iterable[str] | None = None) -> pd.DataFrame:
+    """
+    Download LAU04000 (Eining=index) once and return every category side by side:
+    a DataFrame indexed by month (DatetimeIndex) with one column per category.
+    """
+    client = APIClient(base_url="https://px.hagstofa.is:443/pxis/api/v1")
+    return wage_panel(WageIndex(client), categories)
 
 
 def fetch_wage_series(category: str = "TOTAL"):
     """
     Return a pandas.Series indexed by month (DatetimeIndex) for a given category
     using Hagstofan Wages (LAU04000) with Eining=index.
+    Prefer fetch_wage_panel() when more than one category is needed.
     """
-    client = APIClient(base_url="https://px.hagstofa.is:443/pxis/api/v1")
-    src = WageIndex(client)
-    rows = src.get_series(category)
-    if not rows:
-        # fall back to first available category if requested not present
-        cats = src.list_categories()
-        if not cats:
-            return pd.Series(dtype=float)
-        rows = src.get_series(cats[0])
-    dates, values = zip(*rows) if rows else ([], [])
-    return pd.Series(values, index=pd.to_datetime(dates), dtype=float).sort_index()
+    panel = fetch_wage_panel()
+    if panel.empty:
+        return pd.Series(dtype=float)
+    # fall back to first available category if requested not present
+    col = category if category in panel.columns else sorted(panel.columns)[0]
+    return panel[col].dropna().astype(float)
 
 
 def compute_forecast(series: pd.Series, months: int = 12, window: int = 24) -> List[Tuple[pd.Timestamp, float]]:
@@ -34,25 +54,52 @@ def compute_forecast(series: pd.Series, months: int = 12, window: int = 24) -> L
     Linear regression on the level, anchored to the last observed point.
     Returns list of (future_date, predicted_value) for the next `months`.
     """
-    s = series.dropna().sort_index()
-    if s.empty:
-        return []
+    return forecast_series(series, months, window=window, anchored=True)
+
 
-    if len(s) > window:
-        s = s.iloc[-window:]
+def _month_ordinal(index: pd.DatetimeIndex) -> np.ndarray:
+    """Months since year 0 (2024-03 -> 2024*12 + 2), for aligning series by integer position."""
+    return np.asarray(index.year * 12 + index.month - 1, dtype=np.int64)
 
-    x = date2num(s.index).reshape(-1, 1)
-    y = s.values.astype(float)
 
-    model = LinearRegression().fit(x, y)
+def real_wages(wages: pd.DataFrame, cpi: pd.Series) -> pd.DataFrame:
+    """
+    Wage indices deflated by CPI, for every category and month.
+
+    `wages` is (month × category) and `cpi` the headline level, both on month
+    starts. Both are laid on one dense month grid by ordinal, wage / CPI is taken
+    for the whole matrix and each category is rebased to 100 in its first month
+    with both. YoY is the real change vs 12 months earlier.
+    Returns tidy ['date', 'category', 'index_value', 'yoy'].
+    """
+    columns = ["date", "category", "index_value", "yoy"]
+    cpi = cpi.dropna()
+    if wages.empty or cpi.empty:
+        return pd.DataFrame(columns=columns)
+    w_ord = _month_ordinal(pd.DatetimeIndex(wages.index))
+    c_ord = _month_ordinal(pd.DatetimeIndex(cpi.index))
+    first, last = w_ord.min(), w_ord.max()
+    n = last - first + 1
 
-    # Anchor to last observed level to avoid a visual jump
-    last_x = date2num(s.index[-1])
-    last_hat = model.predict([[last_x]])[0]
-    bias = y[-1] - last_hat
+    W = np.full((n, wages.shape[1]), np.nan)
+    W[w_ord - first] = wages.to_numpy(dtype=float)
+    C = np.full(n, np.nan)
+    inside = (c_ord >= first) & (c_ord <= last)
+    C[c_ord[inside] - first] = cpi.to_numpy(dtype=float)[inside]
 
-    future_dates = [s.index[-1] + pd.DateOffset(months=i) for i in range(1, months + 1)]
-    future_x = date2num(future_dates).reshape(-1, 1)
-    preds = (model.predict(future_x) + bias).tolist()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        R = W / C[:, None]
+        seen = np.isfinite(R)
+        base = R[seen.argmax(axis=0), np.arange(R.shape[1])]     # first month with both
+        real = R / base * 100.0
+        yoy = np.full_like(real, np.nan)
+        yoy[12:] = (real[12:] / real[:-12] - 1.0) * 100.0
 
-    return list(zip(future_dates, preds))
+    months = pd.date_range(wages.index.min(), periods=n, freq="MS")
+    rows, cols = np.nonzero(np.isfinite(real))
+    return pd.DataFrame({
+        "date": months[rows],
+        "category": wages.columns.to_numpy()[cols],
+        "index_value": real[rows, cols],
+        "yoy": yoy[rows, cols],
+    }, columns=columns)
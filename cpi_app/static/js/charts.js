@@ -1,6 +1,6 @@
-// static/js/charts.js (v23)
+// static/js/charts.js (v24)
 (function (global) {
-  console.log("charts.js v23 (dual window)");
+  console.log("charts.js v24 (dual window, prediction bands)");
 
   const fmt = v => v == null ? '—' : Number(v).toLocaleString('is-IS', { maximumFractionDigits: 2 });
   const pct = (a,b)=> (a==null||b==null||b===0)?null:(a/b-1)*100;
@@ -15,7 +15,14 @@
     const key = ds && ds._key; if (!key || !ci.$state) return;
     const hidden = ci.getDatasetMeta(li.datasetIndex)?.hidden === true;
     if (hidden) ci.$state.activeKeys.delete(key); else ci.$state.activeKeys.add(key);
+    // bands follow the line they belong to
+    ci.data.datasets.forEach((d, i) => { if (d._band && d._key === key) ci.getDatasetMeta(i).hidden = hidden; });
+    ci.update();
   }
+  const legendConfig = () => ({
+    position:'bottom', onClick: defaultLegendOnClick,
+    labels:{ filter: (li, data) => !data.datasets[li.datasetIndex]?._band }
+  });
 
   // Hover month + t-12 line
   const hoverYearMarker = {
@@ -38,6 +45,7 @@
   function makeTooltipConfig(labels, seriesFor){
     return {
       displayColors:false,
+      filter: item => !item.dataset._band,
       callbacks:{
         title: items => items?.[0]?.label ?? '',
         label: ctx => `${ctx.dataset.label}: ${fmt(ctx.parsed.y)}`,
@@ -82,7 +90,7 @@
     const items = (chart.data.datasets || []).map((d, i) => {
       const meta = chart.getDatasetMeta(i);
       const visible = meta && meta.hidden !== true;
-      if (!d || !visible || d._key === 'forecast') return null;
+      if (!d || !visible || d._key === 'forecast' || d._band) return null;
 
       // For main/total, use combined (actual+forecast) we stash in state
       const series = (d._key === 'total' || d._key === 'main')
@@ -118,6 +126,20 @@
     return out;
   }
 
+  // Prediction bands (95% under 80%) as lo/hi pairs filled between, placed after the actuals.
+  // Scaled like normalizeTo100AtZero(actual.concat(forecast)) so they stay around the line.
+  function bandDatasets(bands, actual, nFut, norm, hidden){
+    if (!bands || !bands.lo80) return [];
+    const base  = actual[0];
+    const scale = v => v == null ? null : !norm ? v : (base == null || base === 0) ? null : 100*(v/base);
+    const pad   = Array(actual.length).fill(null);
+    const style = { _key:'forecast', _band:true, borderWidth:0, pointRadius:0, pointHitRadius:0, tension:0, spanGaps:false, hidden };
+    return [[95, 'rgba(148,163,184,.14)'], [80, 'rgba(148,163,184,.24)']].flatMap(([lvl, bg]) => [
+      { ...style, label:`${lvl}% bil (neðri)`, data: pad.concat((bands[`lo${lvl}`] || []).slice(0, nFut).map(scale)), fill:false },
+      { ...style, label:`${lvl}% bil`,         data: pad.concat((bands[`hi${lvl}`] || []).slice(0, nFut).map(scale)), fill:'-1', backgroundColor:bg },
+    ]);
+  }
+
   // label lookup for FULL history (for slider labels)
   function setFullLabels(id, labels){
     (global.EconCharts ||= {})._fullLabels = (global.EconCharts._fullLabels || {});
@@ -166,13 +188,16 @@
   }
 
   // ---------------- CPI ----------------
-  function initCPIChart(canvasId, { fullLabels, fullValues, futLabels, futValues, subMeta, subSeries, initialRange='2y' }){
+  function initCPIChart(canvasId, { fullLabels, fullValues, futLabels, futValues, futBottomUp, futBands, subMeta, subSeries, subFuture, initialRange='2y' }){
     const FULL = fullLabels || [];
     const VALL = fullValues || [];
     const FL   = futLabels  || [];
     const FV   = futValues  || [];
+    const FBU  = futBottomUp || [];
+    const BANDS = futBands || {};
     const meta = subMeta    || [];
     const subs = subSeries  || {};
+    const subF = subFuture  || {};
 
     const ctx = getCtx(canvasId); if (!ctx || typeof Chart === 'undefined') return null;
 
@@ -184,7 +209,7 @@
       options:{
         responsive:true, maintainAspectRatio:false,
         interaction:{ mode:'nearest', intersect:false },
-        plugins:{ legend:{ position:'bottom', onClick: defaultLegendOnClick }, tooltip: makeTooltipConfig([], ()=>null) },
+        plugins:{ legend: legendConfig(), tooltip: makeTooltipConfig([], ()=>null) },
         scales:{ x:{ ticks:{ maxRotation:0, autoSkip:true, maxTicksLimit:12 } }, y:{ beginAtZero:false } }
       },
       plugins:[hoverYearMarker]
@@ -196,7 +221,7 @@
       startAbs: Math.max(0, FULL.length - initialN), // left handle
       endAbs:   FULL.length,                          // right handle (latest)
       norm: false,
-      activeKeys: new Set(['total','forecast'])
+      activeKeys: new Set(['total','forecast','bottom_up'])
     };
 
     function rebuild(){
@@ -233,18 +258,34 @@
         borderDash:[6,4], borderWidth:2, tension:0, spanGaps:false, pointRadius:2, pointHoverRadius:4, pointHitRadius:6,
         hidden: !S.activeKeys.has('forecast')
       });
+      if (atEnd) ds.push(...bandDatasets(BANDS, actual, FL.length, S.norm, !S.activeKeys.has('forecast')));
+      if (FBU.some(v => v != null)) {
+        // bottom-up: same scale as the total, so normalize it with the actuals
+        const bu     = atEnd ? actual.concat(FBU) : actual;
+        const buNorm = S.norm ? normalizeTo100AtZero(bu) : bu;
+        ds.push({
+          _key:'bottom_up', label:'Spá (undirvísitölur)',
+          data: atEnd ? Array(actualPlot.length).fill(null).concat(buNorm.slice(actual.length))
+                      : Array(labels.length).fill(null),
+          borderDash:[2,3], borderWidth:2, tension:0, spanGaps:false, pointRadius:2, pointHoverRadius:4, pointHitRadius:6,
+          hidden: !S.activeKeys.has('bottom_up')
+        });
+      }
 
-      // SUBS (aligned to FULL)
+      // SUBS (aligned to FULL), projections (aligned to FL) dashed after the last actual
       const fullLen = FULL.length;
       meta.forEach(m=>{
         const raw = subs[m.code] || [];
         const padded = raw.length < fullLen ? Array(fullLen - raw.length).fill(null).concat(raw) : raw;
         const vis    = padded.slice(S.startAbs, S.endAbs);
-        const combined = atEnd ? vis.concat(Array(FL.length).fill(null)) : vis;
+        const fut    = (subF[m.code] || []).slice(0, FL.length);
+        const combined = atEnd ? vis.concat(fut, Array(FL.length - fut.length).fill(null)) : vis;
         const plot     = S.norm ? normalizeTo100AtZero(combined) : combined;
+        const nVis     = vis.length;
         ds.push({
           _key:`sub:${m.code}`, label:m.label, data:plot,
           borderWidth:2, tension:0, spanGaps:false, pointRadius:0,
+          segment:{ borderDash: c => (c.p1DataIndex >= nVis ? [6,4] : undefined) },
           hidden: !S.activeKeys.has(`sub:${m.code}`)
         });
       });
@@ -275,6 +316,16 @@
 
     rebuild();
 
+    // plot another sub-index, e.g. from /api/isnr/<code> ({labels, value} re-aligned to FULL)
+    chart.$addSeries = (m, labels, values, future) => {
+      const byLabel = new Map((labels || []).map((l, i) => [l, values[i]]));
+      if (!meta.some(x => x.code === m.code)) meta.push(m);
+      subs[m.code] = FULL.map(l => byLabel.has(l) ? byLabel.get(l) : null);
+      subF[m.code] = future || [];
+      chart.$state.activeKeys.add(`sub:${m.code}`);
+      rebuild();
+    };
+
     (global.EconCharts ||= {}).DEBUG = { ...(global.EconCharts.DEBUG||{}), [canvasId]:{ kind:'cpi', chart, state:chart.$state } };
     return chart;
   }
@@ -285,6 +336,7 @@
     const VALL = params.fullValues || params.values || [];
     const FL   = params.futLabels  || [];
     const FV   = params.futValues  || [];
+    const BANDS = params.futBands  || {};
     const meta = params.subMeta    || [];
     const subs = params.subSeries  || {};
     const initialRange = params.initialRange || '2y';
@@ -299,7 +351,7 @@
       options:{
         responsive:true, maintainAspectRatio:false,
         interaction:{ mode:'nearest', intersect:false },
-        plugins:{ legend:{ position:'bottom', onClick: defaultLegendOnClick }, tooltip: makeTooltipConfig([], ()=>null) },
+        plugins:{ legend: legendConfig(), tooltip: makeTooltipConfig([], ()=>null) },
         scales:{ x:{ ticks:{ maxRotation:0, autoSkip:true, maxTicksLimit:12 } }, y:{ beginAtZero:false } }
       },
       plugins:[hoverYearMarker]
@@ -344,6 +396,7 @@
         borderDash:[6,4], borderWidth:2, tension:0, spanGaps:false, pointRadius:2, pointHoverRadius:4, pointHitRadius:6,
         hidden: !S.activeKeys.has('forecast')
       });
+      if (atEnd) ds.push(...bandDatasets(BANDS, actual, FL.length, S.norm, !S.activeKeys.has('forecast')));
 
       // optional subs
       const fullLen = FULL.length;